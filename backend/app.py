@@ -1,30 +1,34 @@
 import streamlit as st
 import pandas as pd
-import os
-import sys
-from io import StringIO
-import contextlib
-import new_new_new_new_new as model
+import numpy as np
+import hashlib
+from io import BytesIO
 
-import joblib
+# The dosha model is loaded on first prediction (not at import) and kept for the process
+from dosha_model import get_dosha_model, predict_dosha as predict_dosha_label
+from food_catalog import FoodCatalog
 
-model = joblib.load("../ml_model/dosha_model.pkl")
-le_sleep = joblib.load("../ml_model/le_sleep.pkl")
-le_digestion = joblib.load("../ml_model/le_digestion.pkl")
-le_body = joblib.load("../ml_model/le_body.pkl")
-le_target = joblib.load("../ml_model/le_target.pkl")
+# Bounds for the shared caches below; entries are evicted by age and count
+CACHE_TTL_SECONDS = 3600
+MAX_CATALOGS = 8
+MAX_PLANS = 256
 
-import requests
+@st.cache_resource(show_spinner=False)
+def load_dosha_model():
+    return get_dosha_model()
 
-def predict_dosha(age, weight, height, sleep, digestion, body_type):
-    sleep = le_sleep.transform([sleep])[0]
-    digestion = le_digestion.transform([digestion])[0]
-    body_type = le_body.transform([body_type])[0]
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=MAX_CATALOGS, show_spinner=False)
+def load_food_catalog(content_hash, _content):
+    # Keyed by the upload's content hash only; the raw bytes are not hashed again
+    return pd.read_csv(BytesIO(_content))
 
-    pred = model.predict([[age, weight, height, sleep, digestion, body_type]])
-    st.write(age, weight, height, sleep, digestion, body_type)
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=MAX_CATALOGS, show_spinner=False)
+def load_food_index(content_hash, _df_foods):
+    # Typed columns and meal-type / dosha / diet indexes, built once per catalog
+    return FoodCatalog.from_frame(_df_foods)
 
-    return le_target.inverse_transform(pred)[0]
+def predict_dosha(age, weight, height, sleep, digestion, body_type):
+    return predict_dosha_label(load_dosha_model(), age, weight, height, sleep, digestion, body_type)
 
 # Set page config
 st.set_page_config(
@@ -143,6 +147,7 @@ def calculate_portion_grams(food, target_nutrients, meal_type):
     return int(portion_grams)
 
 
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=MAX_PLANS, show_spinner=False)
 def nutrient_requirements(age, weight, height, gender, activity, goal):
     # Simple BMR calculation
     if gender == "male":
@@ -183,7 +188,9 @@ with st.sidebar:
     uploaded_file = st.file_uploader("Choose foods.csv", type="csv")
     
     if uploaded_file is not None:
-        df_foods = pd.read_csv(uploaded_file)
+        catalog_bytes = uploaded_file.getvalue()
+        catalog_hash = hashlib.sha256(catalog_bytes).hexdigest()
+        df_foods = load_food_catalog(catalog_hash, catalog_bytes)
         st.success(f"Loaded {len(df_foods)} food items")
         
         # Show a preview of the data
@@ -226,6 +233,11 @@ with st.sidebar:
         index=2
     )
     tod = st.slider("Time of day (hour)", 0, 23, 8)
+    plan_seed = st.number_input("Plan seed", min_value=0, value=0, step=1)
+    
+    st.subheader("Plan Horizon")
+    n_days = st.slider("Plan length (days)", 1, 90, 7)
+    extra_meals = tuple(meal for meal in ["Snack", "Dessert"] if st.checkbox(f"Include {meal.lower()}"))
     
     # Create profile dictionary
     profile = {
@@ -253,85 +265,99 @@ with st.sidebar:
     st.metric("Carbs", f"{carbs:.1f} g")
     
 
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=MAX_PLANS, show_spinner=False)
+def generate_meal_plan(catalog_hash, profile_key, _df_foods):
+    """
+    Build the weekly plan for one catalog and profile. Cached on the catalog hash and
+    the full profile tuple, so reruns with unchanged inputs skip prediction and sampling.
+    """
+    age, weight, height, sleep, digestion, body_type, diet_type, seed, n_days, extra_meals = profile_key
+    df_foods = _df_foods
+    catalog = load_food_index(catalog_hash, df_foods)
+
+    # 🔹 Filter foods based on predicted dosha
+    predicted_dosha = predict_dosha(age, weight, height, sleep, digestion, body_type)
+
+    # Dosha filter: drop foods marked "-" for the predicted dosha
+    dosha = predicted_dosha if predicted_dosha in ("Vata", "Pitta") else "Kapha"
+    positions = catalog.dosha_positions(dosha, "+=")
+
+    # Diet filter
+    if diet_type == "Vegetarian":
+        positions = np.intersect1d(positions, catalog.diet_positions("veg"))
+    elif diet_type == "Non-Vegetarian":
+        positions = np.intersect1d(positions, catalog.diet_positions("non-veg"))
+
+    # Safety fallback
+    used_fallback = len(positions) == 0
+    if used_fallback:
+        positions = np.arange(len(catalog))
+    # Optional slots are only planned when the catalog has foods for them
+    meals = ["Breakfast", "Lunch", "Dinner"] + [
+        meal for meal in extra_meals if len(catalog.meal_type_positions(meal))
+    ]
+
+    # Slice each meal type from the index, then draw every day of a meal type at once
+    rng = np.random.default_rng(seed)
+
+    names = np.full((n_days, len(meals)), "No suitable meal found", dtype=object)
+    nutrients = {column: np.zeros((n_days, len(meals))) for column in
+                 ["Calories", "Protein (g)", "Fats (g)", "Carbs (g)"]}
+
+    for meal_idx, meal in enumerate(meals):
+        meal_positions = np.intersect1d(catalog.meal_type_positions(meal), positions)
+        if len(meal_positions) == 0:
+            continue
+
+        picks = df_foods.iloc[meal_positions[rng.integers(0, len(meal_positions), size=n_days)]]
+        names[:, meal_idx] = picks["Food Name"].to_numpy()
+        for column, values in nutrients.items():
+            values[:, meal_idx] = picks[column].to_numpy()
+
+    plan_df = pd.DataFrame({
+        "day": np.repeat(np.arange(n_days), len(meals)),
+        "meal": np.tile([meal.lower() for meal in meals], n_days),
+        "name_common": names.ravel(),
+        "calories_kcal": nutrients["Calories"].ravel(),
+        "protein_g": nutrients["Protein (g)"].ravel(),
+        "fat_g": nutrients["Fats (g)"].ravel(),
+        "carbs_g": nutrients["Carbs (g)"].ravel()
+    })
+
+    # Dummy portion sizes
+    portion_sizes = {
+        "breakfast": {"calories": 300, "protein": 10, "fat": 5, "carbs": 40},
+        "lunch": {"calories": 500, "protein": 20, "fat": 10, "carbs": 60},
+        "dinner": {"calories": 400, "protein": 15, "fat": 8, "carbs": 50}
+    }
+
+    # Add portion grams
+    plan_df["portion_grams"] = 100
+
+    # Totals
+    totals_df = plan_df.groupby("day")[[
+        "calories_kcal", "protein_g", "fat_g", "carbs_g"
+    ]].sum().reset_index()
+
+    totals_df.columns = ["day", "calories", "protein", "fat", "carbs"]
+
+    return predicted_dosha, used_fallback, plan_df, totals_df, portion_sizes
+
             # Generate plan button
 if st.button("🚀 Generate Meal Plan", type="primary"):
     with st.spinner("Generating your personalized meal plan..."):
         try:
-            # 🔹 Filter foods based on predicted dosha
-
-            predicted_dosha = predict_dosha(age, weight, height, sleep, digestion, body_type)
-            
+            profile_key = (age, weight, height, sleep, digestion, body_type, diet_type, plan_seed,
+                           n_days, extra_meals)
+            predicted_dosha, used_fallback, plan_df, totals_df, portion_sizes = generate_meal_plan(
+                catalog_hash, profile_key, df_foods
+            )
 
             st.subheader("🧠 Dosha Analysis")
             st.success(f"Predicted Dosha: {predicted_dosha}")
 
-            # Dosha filter
-            if predicted_dosha == "Vata":
-                df_foods_filtered = df_foods[df_foods["Vata"] != "-"]
-            elif predicted_dosha == "Pitta":
-                df_foods_filtered = df_foods[df_foods["Pitta"] != "-"]
-            else:
-                df_foods_filtered = df_foods[df_foods["Kapha"] != "-"]
-
-            # Diet filter
-            if diet_type == "Vegetarian":
-                df_foods_filtered = df_foods_filtered[df_foods_filtered["type"] == "veg"]
-            elif diet_type == "Non-Vegetarian":
-                df_foods_filtered = df_foods_filtered[df_foods_filtered["type"] == "non-veg"]
-
-            # Safety fallback
-            if df_foods_filtered.empty:
+            if used_fallback:
                 st.warning("No foods found for selected diet preference. Showing all foods.")
-                df_foods_filtered = df_foods   
-            plan_list = []
-
-            meals = ["Breakfast", "Lunch", "Dinner"]
-
-            for day in range(7):
-                for meal in meals:
-                    meal_df = df_foods_filtered[df_foods_filtered["Meal Type"] == meal]
-
-                    if not meal_df.empty:
-                        row = meal_df.sample(1).iloc[0]
-
-                        plan_list.append({
-                            "day": day,
-                            "meal": meal.lower(),
-                            "name_common": row["Food Name"],
-                            "calories_kcal": row["Calories"],
-                            "protein_g": row["Protein (g)"],
-                            "fat_g": row["Fats (g)"],
-                            "carbs_g": row["Carbs (g)"]
-                        })
-                    else:
-                       plan_list.append({
-                           "day": day,
-                           "meal": meal.lower(),
-                           "name_common": "No suitable meal found",
-                           "calories_kcal": 0,
-                           "protein_g": 0,
-                           "fat_g": 0,
-                           "carbs_g": 0 
-            })    
-
-            plan_df = pd.DataFrame(plan_list)
-
-            # Dummy portion sizes
-            portion_sizes = {
-                "breakfast": {"calories": 300, "protein": 10, "fat": 5, "carbs": 40},
-                "lunch": {"calories": 500, "protein": 20, "fat": 10, "carbs": 60},
-                "dinner": {"calories": 400, "protein": 15, "fat": 8, "carbs": 50}
-            }
-
-            # Add portion grams
-            plan_df["portion_grams"] = 100
-
-            # Totals
-            totals_df = plan_df.groupby("day")[[
-                "calories_kcal", "protein_g", "fat_g", "carbs_g"
-            ]].sum().reset_index()
-
-            totals_df.columns = ["day", "calories", "protein", "fat", "carbs"]
 
             # Save to session state
             st.session_state.meal_plan = plan_df
@@ -342,52 +368,6 @@ if st.button("🚀 Generate Meal Plan", type="primary"):
 
         except Exception as e:
             st.error(f"Error generating meal plan: {str(e)}")
-
-
-            # Add day column (0–6 repeating)
-            plan_df["day"] = plan_df.groupby("meal").cumcount()
-
-            # Dummy portion sizes
-            portion_sizes = {
-                "breakfast": {"calories": 300, "protein": 10, "fat": 5, "carbs": 40},
-                "lunch": {"calories": 500, "protein": 20, "fat": 10, "carbs": 60},
-                "dinner": {"calories": 400, "protein": 15, "fat": 8, "carbs": 50}
-            }
-
-            # Add portion sizes in grams
-            plan_df_with_portions = plan_df.copy()
-
-            portion_grams_list = []
-            for _, row in plan_df.iterrows():
-                meal_type = row['meal'].lower
-
-                if meal_type in portion_sizes:
-                    portion_grams = calculate_portion_grams(
-                        row, portion_sizes[meal_type], meal_type.lower()
-                    )
-                else:
-                    portion_grams = 100
-
-                portion_grams_list.append(portion_grams)
-
-            plan_df_with_portions['portion_grams'] = portion_grams_list
-
-            # Totals
-            totals_df = plan_df_with_portions.groupby("day")[[
-                "calories_kcal", "protein_g", "fat_g", "carbs_g"
-            ]].sum().reset_index()
-
-            totals_df.columns = ["day", "calories", "protein", "fat", "carbs"]
-
-            # Store in session
-            st.session_state.meal_plan = plan_df_with_portions
-            st.session_state.totals = totals_df
-            st.session_state.portion_sizes = portion_sizes
-
-            st.success("Meal plan generated successfully!")
-
-        except Exception as e:
-            st.error(f"Error generating meal plan: {str(e)}")
 # Main content area
 if st.session_state.meal_plan is not None:
     plan_df = st.session_state.meal_plan
@@ -434,23 +414,25 @@ if st.session_state.meal_plan is not None:
         </div>
         """, unsafe_allow_html=True)
     
-    # Display weekly meal plan
-    st.markdown('<h2 class="sub-header">Weekly Meal Plan</h2>', unsafe_allow_html=True)
+    # Display the meal plan, labelled by weekday and, past one week, by week
+    plan_days = int(plan_df['day'].max()) + 1
+    st.markdown('<h2 class="sub-header">Weekly Meal Plan</h2>' if plan_days <= 7 else
+                f'<h2 class="sub-header">{plan_days}-Day Meal Plan</h2>', unsafe_allow_html=True)
     
     days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
     
-    for day in range(7):
-        st.markdown(f"### {days[day]}")
-        
-        day_meals = plan_df[plan_df['day'] == day]
-        
-        # Check if we have all meals
-        meals_found = day_meals['meal'].unique()
+    # First row for each (day, meal), looked up directly instead of filtering plan_df
+    meal_rows = {
+        (row['day'], row['meal']): row
+        for row in plan_df.drop_duplicates(['day', 'meal']).to_dict('records')
+    }
+    
+    for day in range(plan_days):
+        st.markdown(f"### {days[day % 7]}" if plan_days <= 7 else f"### Week {day // 7 + 1} {days[day % 7]}")
         
         # Breakfast
-        breakfast = day_meals[day_meals['meal'] == 'breakfast']
-        if not breakfast.empty:
-            meal = breakfast.iloc[0]
+        meal = meal_rows.get((day, 'breakfast'))
+        if meal is not None:
             st.markdown(f"""
             <div class="meal-card">
                 <b>Breakfast:</b> {meal['name_common']}<br>
@@ -466,9 +448,8 @@ if st.session_state.meal_plan is not None:
             """, unsafe_allow_html=True)
         
         # Lunch
-        lunch = day_meals[day_meals['meal'] == 'lunch']
-        if not lunch.empty:
-            meal = lunch.iloc[0]
+        meal = meal_rows.get((day, 'lunch'))
+        if meal is not None:
             st.markdown(f"""
             <div class="meal-card">
                 <b>Lunch:</b> {meal['name_common']}<br>
@@ -484,9 +465,8 @@ if st.session_state.meal_plan is not None:
             """, unsafe_allow_html=True)
         
         # Dinner
-        dinner = day_meals[day_meals['meal'] == 'dinner']
-        if not dinner.empty:
-            meal = dinner.iloc[0]
+        meal = meal_rows.get((day, 'dinner'))
+        if meal is not None:
             st.markdown(f"""
             <div class="meal-card">
                 <b>Dinner:</b> {meal['name_common']}<br>
@@ -501,10 +481,20 @@ if st.session_state.meal_plan is not None:
             </div>
             """, unsafe_allow_html=True)
         
+        # Snack
+        meal = meal_rows.get((day, 'snack'))
+        if meal is not None:
+            st.markdown(f"""
+            <div class="meal-card">
+                <b>Snack:</b> {meal['name_common']}<br>
+                Portion: {meal['portion_grams']}g<br>
+                Calories: {meal['calories_kcal']:.0f} kcal
+            </div>
+            """, unsafe_allow_html=True)
+        
         # Dessert
-        dessert = day_meals[day_meals['meal'] == 'dessert']
-        if not dessert.empty:
-            meal = dessert.iloc[0]
+        meal = meal_rows.get((day, 'dessert'))
+        if meal is not None:
             st.markdown(f"""
             <div class="meal-card dessert-card">
                 <b>Dessert:</b> {meal['name_common']}<br>
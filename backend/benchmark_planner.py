@@ -0,0 +1,478 @@
+import argparse
+import contextlib
+import os
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from new_new_new_new_new import AdvancedAyurvedicMealPlanner
+
+# Profiles covering young/old, every dietary preference and a few allergy sets
+SAMPLE_PROFILES = [
+    {
+        'age': 35, 'height': 170, 'weight': 70, 'gender': 'male',
+        'prakriti': 'Vata-Pitta', 'vikriti': 'Vata', 'activity_level': 'moderate',
+        'season': 'winter', 'dietary_pref': 'vegetarian', 'allergies': ['dairy', 'nuts']
+    },
+    {
+        'age': 22, 'height': 150, 'weight': 45, 'gender': 'female',
+        'prakriti': 'Kapha', 'vikriti': 'Pitta', 'activity_level': 'sedentary',
+        'season': 'summer', 'dietary_pref': 'all', 'allergies': []
+    },
+    {
+        'age': 70, 'height': 160, 'weight': 50, 'gender': 'female',
+        'prakriti': 'Vata', 'vikriti': 'Kapha, Vata', 'activity_level': 'light',
+        'season': 'spring', 'dietary_pref': 'vegan', 'allergies': ['gluten', 'eggs']
+    },
+    {
+        'age': 65, 'height': 140, 'weight': 40, 'gender': 'female',
+        'prakriti': 'Vata', 'vikriti': None, 'activity_level': 'sedentary',
+        'season': 'autumn', 'dietary_pref': 'all', 'allergies': ['seafood']
+    },
+]
+
+
+@contextlib.contextmanager
+def quiet():
+    """
+    Silence the planner's progress prints and the solver subprocess logs
+    """
+    sys.stdout.flush()
+    saved_fd = os.dup(1)
+    with open(os.devnull, 'w') as devnull:
+        os.dup2(devnull.fileno(), 1)
+        try:
+            with contextlib.redirect_stdout(devnull):
+                yield
+        finally:
+            sys.stdout.flush()
+            os.dup2(saved_fd, 1)
+            os.close(saved_fd)
+
+
+def food_score(planner: AdvancedAyurvedicMealPlanner, food_name: str, profile: Dict,
+               meal_type: str) -> float:
+    """
+    Objective value of a single food for the given profile and meal
+    """
+    food = planner.food_df[planner.food_df['Food Name'] == food_name].iloc[:1]
+    score_table, _ = planner.get_score_table(food)
+    weights = planner.calculate_dosha_weights(profile['vikriti'], profile['age'],
+                                              profile['season'], meal_type)
+    return float(score_table[0] @ np.array([weights[dosha] for dosha in planner.doshas]))
+
+
+def compare_selectors(planner: AdvancedAyurvedicMealPlanner, profile: Dict) -> List[str]:
+    """
+    Run every meal slot of a week through both the closed-form selector and the
+    reused per-meal-type PuLP models, returning a description of each slot where they disagree
+    """
+    _, calories_per_meal = planner.calculate_caloric_needs(
+        profile['age'], profile['height'], profile['weight'],
+        profile['gender'], profile['activity_level']
+    )
+    filtered_foods = planner.filter_foods(profile['dietary_pref'], profile['allergies'])
+    weekly_used_foods = set()
+    meal_models = {}
+    mismatches = []
+
+    for day_idx in range(7):
+        for meal_type in ['breakfast', 'lunch', 'dinner']:
+            args = (filtered_foods, profile['prakriti'], profile['vikriti'], calories_per_meal,
+                    profile['season'], meal_type, profile['age'], weekly_used_foods, day_idx)
+            fast_foods, fast_calories = planner.optimize_meals(*args)
+            with quiet():
+                lp_foods, lp_calories = planner.optimize_meals(*args, use_solver=True, meal_models=meal_models)
+
+            fast_name = fast_foods[0]['name'] if fast_foods else None
+            lp_name = lp_foods[0]['name'] if lp_foods else None
+            if fast_name != lp_name:
+                # Ties between equally scored foods may be broken differently
+                tied = (fast_name and lp_name and
+                        np.isclose(food_score(planner, fast_name, profile, meal_type),
+                                   food_score(planner, lp_name, profile, meal_type)) and
+                        np.isclose(fast_calories, lp_calories, rtol=0.15))
+                if not tied:
+                    mismatches.append(f"day {day_idx} {meal_type}: {fast_name} != {lp_name}")
+
+            if fast_foods:
+                weekly_used_foods.add(fast_foods[0]['name'])
+
+    return mismatches
+
+
+def check_alternatives(planner: AdvancedAyurvedicMealPlanner, profile: Dict, k: int = 5,
+                       no_repeat_days: int = None) -> List[str]:
+    """
+    Compare every meal's top-k alternatives with a brute-force full sort of the eligible
+    foods (none served within no_repeat_days days, or anywhere in the plan when None),
+    returning a description of each slot where they disagree
+    """
+    with quiet():
+        plan = planner.generate_weekly_plan(**profile, alternatives=k, no_repeat_days=no_repeat_days)
+    _, calories_per_meal = planner.calculate_caloric_needs(
+        profile['age'], profile['height'], profile['weight'],
+        profile['gender'], profile['activity_level']
+    )
+    filtered_foods = planner.filter_foods(profile['dietary_pref'], profile['allergies'])
+    days = list(plan['weekly_plan'])
+    window = no_repeat_days or len(days)
+    mismatches = []
+
+    for day_idx, (day, day_plan) in enumerate(plan['weekly_plan'].items()):
+        planned = {food['name'] for other in days if abs(days.index(other) - day_idx) <= window
+                   for meal in plan['weekly_plan'][other]['meals'].values() for food in meal['foods']}
+        for meal_type, meal in day_plan['meals'].items():
+            eligible = []
+            for _, food in filtered_foods.iterrows():
+                if food['Meal Type'].lower() != meal_type or food['Food Name'] in planned:
+                    continue
+                portion = planner.calculate_portion_size(food['Calories'], calories_per_meal)
+                calories = food['Calories'] / planner.standard_portion * portion
+                if calories_per_meal * 0.85 <= calories <= calories_per_meal * 1.15:
+                    eligible.append((-food_score(planner, food['Food Name'], profile, meal_type),
+                                     len(eligible), food['Food Name']))
+            expected = [name for _, _, name in sorted(eligible)[:k]]
+            actual = [food['name'] for food in meal['alternatives']]
+            if actual != expected:
+                mismatches.append(f"{day} {meal_type}: {actual} != {expected}")
+
+    return mismatches
+
+
+def check_calorie_index(planner: AdvancedAyurvedicMealPlanner) -> List[str]:
+    """
+    Check calorie_window_positions against the foods the solver's MinCalories/MaxCalories
+    constraints accept, for every meal type over a sweep of calorie targets. The sweep
+    includes targets that put a food exactly on the window's lower edge.
+    Returns a description of every mismatch.
+    """
+    from new_new_new_new_new import MealTypeModel
+
+    catalog = planner.get_catalog()
+    calories = catalog.calories[np.isfinite(catalog.calories) & (catalog.calories > 0)]
+    edge_targets = calories[:20] * planner.max_portion / (0.85 * planner.standard_portion)
+    targets = np.concatenate([np.arange(100.0, 1500.0, 25.0), edge_targets])
+
+    failures = []
+    for meal_type in catalog.meal_types:
+        meal_type_foods = planner.food_df.iloc[catalog.meal_type_positions(meal_type)]
+        positions = catalog.meal_type_positions(meal_type)
+        for target in targets.tolist():
+            _, contributions, _ = planner.score_meal_candidates(
+                meal_type_foods, None, 30, 'summer', meal_type, target
+            )
+            # A one-food assignment satisfies a constraint iff coefficient + constant has its sign
+            model = MealTypeModel(meal_type, np.zeros(len(positions)), contributions, target)
+            constraints = [model.prob.constraints['MinCalories'], model.prob.constraints['MaxCalories']]
+            accepted = {
+                int(pos) for pos, var in zip(positions, model.variables)
+                if all(constraint.sense * (constraint.get(var, 0) + constraint.constant) >= 0
+                       for constraint in constraints)
+            }
+            indexed = set(planner.calorie_window_positions(meal_type, target).tolist())
+            if indexed != accepted:
+                failures.append(f"{meal_type} at {target:.2f} kcal: index has "
+                                f"{len(indexed - accepted)} extra, {len(accepted - indexed)} missing foods")
+    return failures
+
+
+def plan_dosha_score(planner: AdvancedAyurvedicMealPlanner, meal_plan: Dict, profile: Dict) -> float:
+    """
+    Total dosha balancing score of every food in a generated plan
+    """
+    total = 0.0
+    for day_plan in meal_plan['weekly_plan'].values():
+        for meal_type, meal in day_plan['meals'].items():
+            for food in meal['foods']:
+                total += food_score(planner, food['name'], profile, meal_type)
+    return total
+
+
+def benchmark_weekly_plan(planner: AdvancedAyurvedicMealPlanner, profile: Dict,
+                          repeats: int = 3, **plan_options) -> Tuple[float, Dict]:
+    """
+    Best-of-n wall time of generate_weekly_plan in seconds, with the last plan's solver stamp
+    """
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with quiet():
+            plan = planner.generate_weekly_plan(**profile, **plan_options)
+        timings.append(time.perf_counter() - start)
+    return min(timings), plan.get('solver')
+
+
+def meal_names(plan: Dict) -> Dict:
+    """
+    {(day, meal_type): [food names]} of a weekly plan
+    """
+    return {
+        (day, meal_type): [food['name'] for food in meal['foods']]
+        for day, day_plan in plan['weekly_plan'].items()
+        for meal_type, meal in day_plan['meals'].items()
+    }
+
+
+def check_replan(planner: AdvancedAyurvedicMealPlanner, profile: Dict) -> List[str]:
+    """
+    Check incremental re-plans against their contract and time them against full reruns.
+    Returns a description of every violation.
+    """
+    failures = []
+    with quiet():
+        plan = planner.generate_weekly_plan(**profile)
+    before = meal_names(plan)
+
+    deltas = [
+        ("replace Tuesday dinner", {}, {'replace_meals': [('Tuesday', 'dinner')]}),
+        ("add allergy", {'allergies': profile['allergies'] + ['dairy']}, {}),
+        ("change season", {'season': 'summer' if profile['season'] != 'summer' else 'winter'}, {}),
+    ]
+    for label, changes, options in deltas:
+        new_profile = {**profile, **changes}
+        with quiet():
+            start = time.perf_counter()
+            replanned = planner.replan_weekly_plan(plan, profile, changes, **options)
+            replan_time = time.perf_counter() - start
+            start = time.perf_counter()
+            full = planner.generate_weekly_plan(**new_profile)
+            full_time = time.perf_counter() - start
+        after = meal_names(replanned)
+
+        allowed = set(planner.filter_foods(new_profile['dietary_pref'], new_profile['allergies'])['Food Name'])
+        changed = {slot for slot in before if before[slot] != after[slot]}
+        if any(name not in allowed for names in after.values() for name in names):
+            failures.append(f"{label}: plan contains foods the filters exclude")
+        if label == "replace Tuesday dinner":
+            if changed - {('Tuesday', 'dinner')}:
+                failures.append(f"{label}: other meals changed: {sorted(changed)}")
+            if after[('Tuesday', 'dinner')] == before[('Tuesday', 'dinner')]:
+                failures.append(f"{label}: the replaced meal was picked again")
+        elif label == "add allergy":
+            unaffected = {slot for slot, names in before.items() if all(name in allowed for name in names)}
+            if changed & unaffected:
+                failures.append(f"{label}: unaffected meals changed: {sorted(changed & unaffected)}")
+        elif replanned != full:
+            failures.append(f"{label}: differs from a full generate_weekly_plan")
+
+        print(f"{label:>24} | {len(changed):>2} meals changed | replan {replan_time * 1000:7.2f}ms | "
+              f"full {full_time * 1000:7.2f}ms")
+
+    return failures
+
+
+def rotation_names(rotation: Dict) -> List[Dict]:
+    return [meal_names(week) for week in rotation['weeks']]
+
+
+def check_parallel(planner: AdvancedAyurvedicMealPlanner, profile: Dict, weeks: int = 4,
+                   seed: int = 7) -> List[str]:
+    """
+    Check that partitioned rotations are identical for a seed whatever the pool
+    (in-thread, threads, processes) and repeat no food while the catalog allows it.
+    Times them against planning the weeks one after another. Returns every violation.
+    """
+    failures = []
+    runs = {}
+    with quiet():
+        start = time.perf_counter()
+        for _ in range(weeks):
+            planner.generate_weekly_plan(**profile)
+        sequential_time = time.perf_counter() - start
+        for label, options in [("in-thread", {'max_workers': 1}), ("threads", {'max_workers': 4}),
+                               ("processes", {'max_workers': 2, 'processes': True})]:
+            start = time.perf_counter()
+            runs[label] = (planner.generate_rotation_plan(profile, weeks=weeks, seed=seed, **options),
+                           time.perf_counter() - start)
+
+    reference, _ = runs["in-thread"]
+    for label, (rotation, _) in runs.items():
+        if rotation_names(rotation) != rotation_names(reference):
+            failures.append(f"{label}: rotation differs from the in-thread run with the same seed")
+
+    slots = weeks * 7
+    filtered = planner.filter_foods(profile['dietary_pref'], profile['allergies'])
+    for meal_type in ['breakfast', 'lunch', 'dinner']:
+        if len(planner.select_meal_type(filtered, meal_type)) < slots:
+            break
+    else:
+        if reference['rotation']['repeated_servings']:
+            failures.append(f"{reference['rotation']['repeated_servings']} repeated servings in the rotation")
+
+    print(f"{weeks} weeks sequential {sequential_time * 1000:7.1f}ms | " + " | ".join(
+        f"{label} {seconds * 1000:7.1f}ms" for label, (_, seconds) in runs.items()
+    ) + f" | {reference['rotation']['distinct_foods']} distinct foods")
+    return failures
+
+
+def check_horizon(planner: AdvancedAyurvedicMealPlanner, profile: Dict, n_days: int = 90,
+                  window: int = 5) -> List[str]:
+    """
+    Stream a long plan with a sliding no-repeat window, check the window holds and compare
+    time and peak Python memory with building the same horizon as one nested plan
+    """
+    failures = []
+    recent = []
+    with quiet():
+        tracemalloc.start()
+        start = time.perf_counter()
+        for day, day_plan in planner.iter_meal_plan(**profile, n_days=n_days, no_repeat_days=window):
+            names = {food['name'] for meal in day_plan['meals'].values() for food in meal['foods']}
+            if names & set().union(*recent[-window:]):
+                failures.append(f"{day}: repeats a food from the previous {window} days")
+            recent = recent[-window:] + [names]
+        stream_time = time.perf_counter() - start
+        _, stream_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        
+        start = time.perf_counter()
+        planner.generate_weekly_plan(**profile, n_days=n_days, no_repeat_days=window)
+        full_time = time.perf_counter() - start
+        _, full_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(f"{n_days} days | streamed {stream_time * 1000:8.1f}ms, peak {stream_peak / 1e6:6.2f} MB | "
+          f"nested plan {full_time * 1000:8.1f}ms, peak {full_peak / 1e6:6.2f} MB")
+    return failures
+
+
+def plan_fit(planner: AdvancedAyurvedicMealPlanner, meal_plan: Dict, profile: Dict) -> Dict:
+    """
+    How well a plan meets its targets: share of meals inside the calorie window,
+    mean foods per meal and mean relative daily macro deviation
+    """
+    daily_calories, calories_per_meal = planner.calculate_caloric_needs(
+        profile['age'], profile['height'], profile['weight'],
+        profile['gender'], profile['activity_level']
+    )
+    macro_targets = planner.calculate_macro_targets(profile['weight'], daily_calories)
+
+    meals = [meal for day_plan in meal_plan['weekly_plan'].values() for meal in day_plan['meals'].values()]
+    in_window = [calories_per_meal * 0.85 - 0.1 <= meal['total_calories'] <= calories_per_meal * 1.15 + 0.1
+                 for meal in meals]
+    deviations = [
+        abs(sum(food[macro] for meal in day_plan['meals'].values() for food in meal['foods']) - target) / target
+        for day_plan in meal_plan['weekly_plan'].values()
+        for macro, target in macro_targets.items()
+    ]
+    return {
+        'in_window': float(np.mean(in_window)),
+        'foods_per_meal': float(np.mean([len(meal['foods']) for meal in meals])),
+        'macro_deviation': float(np.mean(deviations))
+    }
+
+
+def benchmark_combination(planner: AdvancedAyurvedicMealPlanner, repeats: int):
+    """
+    Compare one-food meals with combination meals on speed and target fit
+    """
+    print(f"{'profile':>18} | {'mode':>11} | {'time':>10} | {'in window':>9} | "
+          f"{'foods/meal':>10} | {'macro dev':>9}")
+    for profile in SAMPLE_PROFILES:
+        label = f"{profile['dietary_pref']} age {profile['age']}"
+        for mode, options in (('single', {}), ('combination', {'combination': True})):
+            elapsed, _ = benchmark_weekly_plan(planner, profile, repeats, **options)
+            with quiet():
+                meal_plan = planner.generate_weekly_plan(**profile, **options)
+            fit = plan_fit(planner, meal_plan, profile)
+            print(f"{label:>18} | {mode:>11} | {elapsed * 1000:8.1f}ms | {fit['in_window']:9.0%} | "
+                  f"{fit['foods_per_meal']:10.2f} | {fit['macro_deviation']:9.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Ayurvedic meal planner")
+    parser.add_argument("--foods", default="newnew_foods.csv", help="Food catalog CSV")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--check", action="store_true",
+                        help="Verify the closed-form selector against the PuLP solver")
+    parser.add_argument("--combination", action="store_true",
+                        help="Benchmark multi-food meals against one-food meals")
+    parser.add_argument("--replan", action="store_true",
+                        help="Check and time incremental re-planning against full reruns")
+    parser.add_argument("--parallel", action="store_true",
+                        help="Check and time parallel, partitioned multi-week rotations")
+    parser.add_argument("--horizon", type=int, default=None, metavar="DAYS",
+                        help="Check a streamed plan of DAYS days with a 5-day no-repeat window")
+    parser.add_argument("--solver", default="auto", help="MILP engine: auto, cbc, highs or glpk")
+    parser.add_argument("--solver-time-limit", type=float, default=10.0, help="Seconds per solve")
+    args = parser.parse_args()
+
+    with quiet():
+        planner = AdvancedAyurvedicMealPlanner(args.foods)
+    planner.configure_solver(engine=args.solver, time_limit=args.solver_time_limit)
+
+    if args.combination:
+        benchmark_combination(planner, args.repeats)
+        return
+
+    if args.horizon:
+        failures = [failure for profile in SAMPLE_PROFILES
+                    for failure in check_horizon(planner, profile, args.horizon)]
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        print("Horizon check passed" if not failures else f"Horizon check failed: {len(failures)} failures")
+        raise SystemExit(1 if failures else 0)
+
+    if args.parallel:
+        failures = [failure for profile in SAMPLE_PROFILES for failure in check_parallel(planner, profile)]
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        print("Parallel check passed" if not failures else f"Parallel check failed: {len(failures)} failures")
+        raise SystemExit(1 if failures else 0)
+
+    if args.replan:
+        failures = [failure for profile in SAMPLE_PROFILES for failure in check_replan(planner, profile)]
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        print("Replan check passed" if not failures else f"Replan check failed: {len(failures)} failures")
+        raise SystemExit(1 if failures else 0)
+
+    if args.check:
+        failures = 0
+        for profile in SAMPLE_PROFILES:
+            for mismatch in compare_selectors(planner, profile):
+                failures += 1
+                print(f"MISMATCH ({profile['dietary_pref']}, age {profile['age']}): {mismatch}")
+        print("Selector check passed" if not failures else f"Selector check failed: {failures} mismatches")
+
+        for profile in SAMPLE_PROFILES:
+            for no_repeat_days in (None, 1, 2):
+                for mismatch in check_alternatives(planner, profile, no_repeat_days=no_repeat_days):
+                    failures += 1
+                    print(f"ALTERNATIVES ({profile['dietary_pref']}, age {profile['age']}, "
+                          f"no_repeat_days={no_repeat_days}): {mismatch}")
+        print("Alternatives check passed" if not failures else f"Checks failed: {failures} mismatches")
+
+        for mismatch in check_calorie_index(planner):
+            failures += 1
+            print(f"CALORIE INDEX: {mismatch}")
+        print("Calorie index check passed" if not failures else f"Checks failed: {failures} mismatches")
+        raise SystemExit(1 if failures else 0)
+
+    print(f"{'profile':>18} | {'selector':>10} | {'solver':>10} | {'in solver':>21} | {'global':>10} | "
+          f"{'sequential score':>16} | {'global score':>12} | {'timeouts/fallbacks':>18}")
+    for profile in SAMPLE_PROFILES:
+        selector_time, _ = benchmark_weekly_plan(planner, profile, args.repeats)
+        # Solver stamp of the last solver run
+        solver_time, solver = benchmark_weekly_plan(planner, profile, args.repeats, use_solver=True)
+        solver_calls = (f"{solver['seconds'] * 1000:7.1f}ms / {solver['calls']:>2} calls"
+                        if solver['calls'] else f"{'-':>21}")
+        fallbacks = f"{solver['timeouts']}/{solver['fallbacks']}"
+        global_time, _ = benchmark_weekly_plan(planner, profile, args.repeats, mode="global")
+
+        with quiet():
+            sequential_plan = planner.generate_weekly_plan(**profile)
+            global_plan = planner.generate_weekly_plan(**profile, mode="global")
+
+        label = f"{profile['dietary_pref']} age {profile['age']}"
+        print(f"{label:>18} | {selector_time * 1000:8.1f}ms | {solver_time * 1000:8.1f}ms | "
+              f"{solver_calls} | {global_time * 1000:8.1f}ms | {plan_dosha_score(planner, sequential_plan, profile):16.2f} | "
+              f"{plan_dosha_score(planner, global_plan, profile):12.2f} | {fallbacks:>18}")
+
+
+if __name__ == "__main__":
+    main()
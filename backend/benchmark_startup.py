@@ -0,0 +1,83 @@
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Import-time budgets in milliseconds. Most of each budget is pandas/numpy,
+# which the planner needs to load its catalog.
+STARTUP_BUDGETS_MS = {
+    'new_new_new_new_new': 1500,
+    'dosha_model': 50,
+    'planner_service': 1600,
+}
+
+# Heavy packages that must only be imported on first solve, classify or predict
+DEFERRED_MODULES = ['pulp', 'transformers', 'torch', 'sklearn', 'joblib']
+
+
+def measure_import(module: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+    Returns its cumulative import time in ms and every (module, cumulative ms) imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+
+    imported = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        imported.append((name.strip(), int(cumulative_us) / 1000))
+
+    total_ms = next(ms for name, ms in reversed(imported) if name == module)
+    return total_ms, imported
+
+
+def check_startup(budgets: Dict[str, float], repeats: int) -> List[str]:
+    """
+    Measure every budgeted module and return a description of each violation
+    """
+    failures = []
+    for module, budget_ms in budgets.items():
+        # Best of n to filter out disk cache and scheduler noise
+        runs = [measure_import(module) for _ in range(repeats)]
+        total_ms, imported = min(runs, key=lambda run: run[0])
+
+        slowest = sorted(((ms, name) for name, ms in imported if "." not in name and name != module),
+                         reverse=True)[:3]
+        print(f"{module:>22}: {total_ms:8.1f} ms (budget {budget_ms:.0f} ms) | slowest: "
+              + ", ".join(f"{name} {ms:.0f} ms" for ms, name in slowest))
+
+        if total_ms > budget_ms:
+            failures.append(f"{module} imports in {total_ms:.1f} ms, over its {budget_ms:.0f} ms budget")
+
+        eager = sorted({name.split(".")[0] for name, _ in imported} & set(DEFERRED_MODULES))
+        if eager:
+            failures.append(f"{module} eagerly imports {', '.join(eager)}")
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check backend import-time budgets")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiply every budget, e.g. for slower CI machines")
+    args = parser.parse_args()
+
+    budgets = {module: budget * args.scale for module, budget in STARTUP_BUDGETS_MS.items()}
+    failures = check_startup(budgets, args.repeats)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from benchmark_planner import SAMPLE_PROFILES, quiet
+from dosha_model import MODEL_DIR, load_dosha_model, predict_dosha, predict_doshas
+from new_new_new_new_new import AdvancedAyurvedicMealPlanner
+
+# Meal-type split and dosha-symbol mix (-, =, +) of the bundled newnew_foods.csv
+MEAL_TYPE_SHARES = {'Breakfast': 0.22, 'Lunch': 0.39, 'Dinner': 0.39}
+DEFAULT_SYMBOL_MIX = (0.39, 0.05, 0.56)
+
+# Dish names free of every allergen and non-veg keyword, with taste-table ingredients
+BASE_DISHES = [
+    'Rice Bowl', 'Moong Dal', 'Spinach Sabzi', 'Potato Curry', 'Cauliflower Stir Fry',
+    'Quinoa Khichdi', 'Millet Upma', 'Ragi Dosa', 'Poha', 'Idli', 'Vegetable Pulao',
+    'Lemon Rice', 'Banana Porridge', 'Apple Oats', 'Mango Lassi Bowl', 'Ginger Dal Soup',
+    'Cumin Potato', 'Coriander Rice', 'Turmeric Lentils', 'Mustard Greens'
+]
+# Ingredients that make a dish match an allergy (see AdvancedAyurvedicMealPlanner.allergy_keywords)
+ALLERGEN_INGREDIENTS = {
+    'dairy': ['Paneer', 'Ghee', 'Yogurt'],
+    'nuts': ['Almond', 'Cashew'],
+    'gluten': ['Wheat', 'Maida'],
+    'seafood': ['Fish', 'Prawn'],
+    'eggs': ['Egg'],
+}
+NON_VEG_INGREDIENTS = {'Fish', 'Prawn', 'Egg', 'Chicken', 'Mutton'}
+
+# Patient attributes for predict_dosha, as in ml_model/dosha_dataset.csv
+PATIENT_VOCABULARIES = {
+    'sleep': ['light', 'medium', 'heavy'],
+    'digestion': ['weak', 'strong', 'slow'],
+    'body_type': ['thin', 'medium', 'heavy'],
+}
+
+STAGES = ['filter_foods', 'optimize_meals', 'generate_weekly_plan', 'export_to_csv']
+
+
+def generate_catalog(rows: int, seed: int = 0, allergen_share: float = 0.3, non_veg_share: float = 0.1,
+                     symbol_mix=DEFAULT_SYMBOL_MIX) -> pd.DataFrame:
+    """
+    Synthetic foods with the new_foods.csv schema. allergen_share of the dishes carry an
+    allergen ingredient (spread evenly over the planner's allergies), non_veg_share of the
+    rest a meat one, and each dosha symbol is drawn from symbol_mix, the shares of '-', '='
+    and '+'. Seafood and egg dishes are non-veg too, so more than non_veg_share of the
+    foods are non-veg; run_suite records each catalog's real share in its meta.
+    """
+    rng = np.random.default_rng(seed)
+    meal_types = rng.choice(list(MEAL_TYPE_SHARES), rows, p=list(MEAL_TYPE_SHARES.values()))
+
+    ingredients = np.full(rows, "", dtype=object)
+    allergenic = rng.random(rows) < allergen_share
+    allergens = rng.choice(list(ALLERGEN_INGREDIENTS), allergenic.sum())
+    ingredients[allergenic] = [rng.choice(ALLERGEN_INGREDIENTS[allergen]) for allergen in allergens]
+    meat = ~allergenic & (rng.random(rows) < non_veg_share)
+    ingredients[meat] = rng.choice(['Chicken', 'Mutton'], meat.sum())
+
+    dishes = rng.choice(BASE_DISHES, rows)
+    names = [f"{ingredient} {dish} #{i}".lstrip() for i, (ingredient, dish) in enumerate(zip(ingredients, dishes))]
+
+    # Main meals run larger than breakfasts; macros split the calories by energy share
+    calories = np.where(meal_types == 'Breakfast', rng.uniform(120, 450, rows), rng.uniform(150, 650, rows)).round()
+    energy = rng.dirichlet([2, 2, 5], rows)
+    symbol_mix = np.asarray(symbol_mix, dtype=float) / np.sum(symbol_mix)
+
+    return pd.DataFrame({
+        'Meal Type': meal_types,
+        'Food Name': names,
+        'Calories': calories.astype(int),
+        'Protein (g)': (energy[:, 0] * calories / 4).round(1),
+        'Fats (g)': (energy[:, 1] * calories / 9).round(1),
+        'Carbs (g)': (energy[:, 2] * calories / 4).round(1),
+        **{dosha: rng.choice(['-', '=', '+'], rows, p=symbol_mix) for dosha in ['Vata', 'Pitta', 'Kapha']},
+        'type': np.where([ingredient in NON_VEG_INGREDIENTS for ingredient in ingredients], 'non-veg', 'veg')
+    })
+
+
+def measure(planner: AdvancedAyurvedicMealPlanner, run: Callable, repeats: int) -> Dict:
+    """
+    Time a stage: one cold run, then repeats warm runs (median reported) with the solver
+    time and calls of the last one, from the solver stamp run returns (None when the stage
+    never solves). Peak memory comes from one extra run under tracemalloc, which slows
+    code down and so is kept out of the timings; solver subprocesses are not traced.
+    """
+    timings = []
+    for _ in range(1 + repeats):
+        start = time.perf_counter()
+        with quiet():
+            solver = run()
+        timings.append(time.perf_counter() - start)
+    solver = solver or planner.solver_summary([])
+
+    tracemalloc.start()
+    with quiet():
+        run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'cold_seconds': round(timings[0], 6),
+        'wall_seconds': round(statistics.median(timings[1:] or timings), 6),
+        'solver_seconds': solver['seconds'],
+        'solver_calls': solver['calls'],
+        'peak_mib': round(peak / 2 ** 20, 3)
+    }
+
+
+def profile_name(profile: Dict) -> str:
+    return (f"{profile['dietary_pref']}/{profile['vikriti'] or 'no vikriti'}/{profile['season']}/"
+            f"{'+'.join(profile['allergies']) or 'no allergies'}")
+
+
+def benchmark_profile(planner: AdvancedAyurvedicMealPlanner, profile: Dict, repeats: int,
+                      use_solver: bool, export_path: str) -> Dict:
+    """
+    Stage timings of one profile's plan on the planner's catalog
+    """
+    _, calories_per_meal = planner.calculate_caloric_needs(
+        profile['age'], profile['height'], profile['weight'], profile['gender'], profile['activity_level']
+    )
+    filtered_foods = planner.filter_foods(profile['dietary_pref'], profile['allergies'])
+
+    def filter_day():
+        planner.filter_foods(profile['dietary_pref'], profile['allergies'])
+
+    def optimize_day():
+        used_foods = set()
+        solver_log = []
+        for meal_type in planner.main_meal_types:
+            foods, _ = planner.optimize_meals(
+                filtered_foods, profile['prakriti'], profile['vikriti'], calories_per_meal,
+                profile['season'], meal_type, profile['age'], used_foods, 0, use_solver=use_solver,
+                solver_log=solver_log
+            )
+            used_foods.update(food['name'] for food in foods)
+        return planner.solver_summary(solver_log)
+
+    plans = []
+
+    def weekly_plan():
+        plans.append(planner.generate_weekly_plan(**profile, use_solver=use_solver))
+        return plans[-1]['solver']
+
+    def export_plan():
+        planner.export_to_csv(plans[-1], export_path)
+
+    stages = {
+        'filter_foods': measure(planner, filter_day, repeats),
+        'optimize_meals': measure(planner, optimize_day, repeats),
+        'generate_weekly_plan': measure(planner, weekly_plan, repeats),
+    }
+    stages['export_to_csv'] = measure(planner, export_plan, repeats)
+    return {'profile': profile_name(profile), 'filtered_foods': len(filtered_foods), 'stages': stages}
+
+
+def benchmark_predict_dosha(patients: int, repeats: int, seed: int = 0) -> Dict:
+    """
+    Single-patient and batch dosha prediction with the deployed model
+    """
+    try:
+        with quiet():
+            model = load_dosha_model(MODEL_DIR)
+    except Exception as e:
+        return {'error': str(e)}
+
+    rng = np.random.default_rng(seed)
+    batch = [
+        {'age': int(rng.integers(18, 80)), 'weight': float(rng.uniform(40, 110)),
+         'height': float(rng.uniform(145, 195)),
+         **{column: str(rng.choice(vocabulary)) for column, vocabulary in PATIENT_VOCABULARIES.items()}}
+        for _ in range(patients)
+    ]
+    patient = batch[0]
+
+    single = []
+    for _ in range(repeats * 100):
+        start = time.perf_counter()
+        predict_dosha(model, *patient.values())
+        single.append(time.perf_counter() - start)
+
+    batched = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict_doshas(model, batch)
+        batched.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    predict_doshas(model, batch)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'model': type(model).__name__,
+        'single_seconds': round(statistics.median(single), 8),
+        'batch_patients': patients,
+        'batch_seconds': round(statistics.median(batched), 6),
+        'batch_peak_mib': round(peak / 2 ** 20, 3)
+    }
+
+
+def run_suite(row_counts: List[int], repeats: int, seed: int, allergen_share: float, non_veg_share: float,
+              symbol_mix, use_solver: bool, patients: int) -> Dict:
+    catalogs = []
+    # Real non-veg share of each catalog: seafood and egg allergens add to non_veg_share
+    non_veg_foods = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows in row_counts:
+            csv_path = os.path.join(tmp_dir, f"foods_{rows}.csv")
+            catalog = generate_catalog(rows, seed, allergen_share, non_veg_share, symbol_mix)
+            catalog.to_csv(csv_path, index=False)
+
+            start = time.perf_counter()
+            with quiet():
+                # Keyword allergen matching only, so timings never include loading a zero-shot model
+                planner = AdvancedAyurvedicMealPlanner(csv_path, use_allergy_model=False)
+            load_seconds = time.perf_counter() - start
+
+            profiles = [
+                benchmark_profile(planner, profile, repeats, use_solver, os.path.join(tmp_dir, "plan.csv"))
+                for profile in SAMPLE_PROFILES
+            ]
+            catalogs.append({'rows': rows, 'load_seconds': round(load_seconds, 6), 'profiles': profiles})
+            non_veg_foods[rows] = round(float((catalog['type'] == 'non-veg').mean()), 4)
+
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'cpus': os.cpu_count(),
+            'repeats': repeats,
+            'use_solver': use_solver,
+            'generator': {'seed': seed, 'allergen_share': allergen_share, 'non_veg_share': non_veg_share,
+                          'symbol_mix': dict(zip(['-', '=', '+'], symbol_mix)),
+                          'non_veg_foods': non_veg_foods}
+        },
+        'catalogs': catalogs,
+        'predict_dosha': benchmark_predict_dosha(patients, repeats, seed)
+    }
+
+
+def stage_times(results: Dict) -> Dict:
+    return {
+        (catalog['rows'], profile['profile'], stage): timing['wall_seconds']
+        for catalog in results['catalogs'] for profile in catalog['profiles']
+        for stage, timing in profile['stages'].items()
+    }
+
+
+def print_results(results: Dict, baseline: Dict = None):
+    baseline_times = stage_times(baseline) if baseline else {}
+    print(f"{'rows':>7} | {'stage':<20} | {'wall ms':>9} | {'cold ms':>9} | {'solver ms':>9} | "
+          f"{'peak MiB':>8}" + (" | vs baseline" if baseline else ""))
+    for catalog in results['catalogs']:
+        for stage in STAGES:
+            timings = [profile['stages'][stage] for profile in catalog['profiles']]
+            # Totals over the profiles
+            wall = sum(timing['wall_seconds'] for timing in timings)
+            line = (f"{catalog['rows']:>7} | {stage:<20} | {wall * 1000:9.2f} | "
+                    f"{sum(timing['cold_seconds'] for timing in timings) * 1000:9.2f} | "
+                    f"{sum(timing['solver_seconds'] for timing in timings) * 1000:9.2f} | "
+                    f"{max(timing['peak_mib'] for timing in timings):8.2f}")
+            base = [baseline_times.get((catalog['rows'], profile['profile'], stage)) for profile in catalog['profiles']]
+            if baseline and None not in base:
+                line += f" | {wall / sum(base):.2f}x"
+            print(line)
+
+    dosha = results['predict_dosha']
+    if 'error' in dosha:
+        print(f"predict_dosha: skipped ({dosha['error']})")
+    else:
+        print(f"predict_dosha ({dosha['model']}): {dosha['single_seconds'] * 1e6:.1f} us single, "
+              f"{dosha['batch_seconds'] * 1000:.2f} ms per {dosha['batch_patients']} patients")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the planning hot paths on synthetic catalogs")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--allergen-share", type=float, default=0.3,
+                        help="Fraction of foods containing an allergen ingredient")
+    parser.add_argument("--non-veg-share", type=float, default=0.1,
+                        help="Fraction of the remaining foods containing meat")
+    parser.add_argument("--symbol-mix", type=float, nargs=3, default=list(DEFAULT_SYMBOL_MIX),
+                        metavar=("MINUS", "EQUAL", "PLUS"), help="Relative shares of '-', '=' and '+' dosha effects")
+    parser.add_argument("--use-solver", action="store_true", help="Plan with the MILP solver instead of the selector")
+    parser.add_argument("--patients", type=int, default=10000, help="Batch size for predict_dosha")
+    parser.add_argument("--out", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare wall times against")
+    args = parser.parse_args()
+
+    results = run_suite(args.rows, args.repeats, args.seed, args.allergen_share, args.non_veg_share,
+                        args.symbol_mix, args.use_solver, args.patients)
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+from functools import lru_cache
+from typing import Dict, List, Sequence, Union
+
+# Trained artifacts written by ml_model/train_model.py
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ml_model")
+BUNDLE_DIR = "dosha_model.bundle"
+
+# Bump whenever the on-disk layout written by write_bundle changes
+BUNDLE_FORMAT = "ayur-rasa-dosha-model"
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+# Per-node tree arrays stored as one .npy each
+TREE_ARRAYS = ["feature", "threshold", "children_left", "children_right", "node_class"]
+
+# Model inputs in training order; categorical ones are label-encoded with these encoders
+FEATURES = ["age", "weight", "height", "sleep", "digestion", "body_type"]
+CATEGORICAL_ENCODERS = {"sleep": "le_sleep", "digestion": "le_digestion", "body_type": "le_body"}
+
+
+class CompiledDoshaModel:
+    """
+    The dosha DecisionTreeClassifier and its LabelEncoders flattened to NumPy arrays
+    (see export_compiled_model in ml_model/train_model.py). A whole batch of patients
+    is scored with one vectorized tree traversal, without importing scikit-learn.
+    """
+    def __init__(self, feature, threshold, children_left, children_right, node_class,
+                 classes, categories: Dict, manifest: Dict = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        # Class index (into classes) predicted at each node; only leaves are read
+        self.node_class = node_class
+        self.classes = classes
+        # Sorted vocabulary of each categorical feature, as LabelEncoder.classes_
+        self.categories = categories
+        # Bundle manifest the model was loaded from, if any
+        self.manifest = manifest
+
+    @classmethod
+    def load(cls, directory: str, verify: bool = True) -> "CompiledDoshaModel":
+        return load_bundle(directory, verify)
+
+    def encode(self, column: str, values: Sequence[str]):
+        """
+        LabelEncoder.transform for a categorical feature; unseen labels raise ValueError
+        """
+        import numpy as np
+
+        vocabulary = self.categories[column]
+        values = np.asarray(values, dtype=str)
+        codes = np.searchsorted(vocabulary, values)
+        known = (codes < len(vocabulary)) & (vocabulary[np.minimum(codes, len(vocabulary) - 1)] == values)
+        if not known.all():
+            raise ValueError(f"y contains previously unseen labels: {sorted(set(values[~known].tolist()))}")
+        return codes
+
+    def predict_batch(self, age, weight, height, sleep, digestion, body_type):
+        """
+        Predicted dosha labels for equal-length sequences of patient attributes
+        """
+        import numpy as np
+
+        # scikit-learn compares float32 features against float64 thresholds
+        X = np.column_stack([
+            np.asarray(age, dtype=np.float32), np.asarray(weight, dtype=np.float32),
+            np.asarray(height, dtype=np.float32),
+            self.encode("sleep", sleep), self.encode("digestion", digestion),
+            self.encode("body_type", body_type)
+        ]).astype(np.float32)
+
+        rows = np.arange(len(X))
+        node = np.zeros(len(X), dtype=np.intp)
+        while True:
+            left = self.children_left[node]
+            internal = left != -1
+            if not internal.any():
+                break
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(internal, np.where(go_left, left, self.children_right[node]), node)
+
+        return self.classes[self.node_class[node]]
+
+
+def array_digest(array) -> str:
+    import numpy as np
+
+    return hashlib.sha256(np.ascontiguousarray(array).data).hexdigest()
+
+
+def write_bundle(directory: str, arrays: Dict, classes: List[str], categories: Dict[str, List[str]],
+                 metadata: Dict = None) -> str:
+    """
+    Write a model bundle: one .npy per tree array and a versioned manifest with the
+    feature order, category vocabularies, target classes and a digest of every array.
+    Arrays can then be memory-mapped read-only and shared between worker processes.
+    """
+    import numpy as np
+
+    os.makedirs(directory, exist_ok=True)
+    entries = {}
+    for name in TREE_ARRAYS:
+        array = np.ascontiguousarray(arrays[name])
+        np.save(os.path.join(directory, f"{name}.npy"), array)
+        entries[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'sha256': array_digest(array)}
+
+    # One id for the whole bundle, so deployments can tell models apart
+    model_id = hashlib.sha256(json.dumps(
+        [entries, classes, categories], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'version': BUNDLE_FORMAT_VERSION,
+        'model_id': model_id,
+        'features': FEATURES,
+        'categories': categories,
+        'classes': list(classes),
+        'nodes': len(arrays['feature']),
+        'arrays': entries,
+        **(metadata or {})
+    }
+    # The manifest is written last and atomically, so a partial export is never loaded
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return directory
+
+
+def load_bundle(directory: str, verify: bool = True) -> CompiledDoshaModel:
+    """
+    Load a model bundle with its tree arrays memory-mapped. Raises ValueError for a
+    bundle of another format version, a different feature order or vocabulary layout,
+    or arrays that do not match the manifest (e.g. from an interrupted re-export).
+    """
+    import numpy as np
+
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != BUNDLE_FORMAT or manifest.get('version') != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"{directory} is not a version {BUNDLE_FORMAT_VERSION} dosha model bundle; re-export it")
+    if manifest.get('features') != FEATURES:
+        raise ValueError(f"{directory} was trained on {manifest.get('features')}, expected {FEATURES}")
+
+    categories = manifest.get('categories', {})
+    if sorted(categories) != sorted(CATEGORICAL_ENCODERS):
+        raise ValueError(f"{directory} has vocabularies for {sorted(categories)}, "
+                         f"expected {sorted(CATEGORICAL_ENCODERS)}")
+    if any(vocabulary != sorted(vocabulary) for vocabulary in categories.values()):
+        raise ValueError(f"{directory} has unsorted category vocabularies")
+
+    arrays = {}
+    for name in TREE_ARRAYS:
+        entry = manifest['arrays'][name]
+        array = np.asarray(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r'))
+        if (array.dtype.str != entry['dtype'] or list(array.shape) != entry['shape']
+                or entry['shape'] != [manifest['nodes']]):
+            raise ValueError(f"{directory}/{name}.npy does not match the bundle manifest")
+        if verify and array_digest(array) != entry['sha256']:
+            raise ValueError(f"{directory}/{name}.npy does not match the bundle manifest")
+        arrays[name] = array
+
+    nodes, classes = manifest['nodes'], manifest['classes']
+    children = np.concatenate([arrays['children_left'], arrays['children_right']])
+    if (children >= nodes).any() or (arrays['node_class'] >= len(classes)).any():
+        raise ValueError(f"{directory} has node indexes outside the tree")
+
+    return CompiledDoshaModel(
+        **arrays,
+        classes=np.asarray(classes, dtype=str),
+        categories={column: np.asarray(categories[column], dtype=str) for column in CATEGORICAL_ENCODERS},
+        manifest=manifest
+    )
+
+
+def load_dosha_model(model_dir: str = MODEL_DIR) -> Union[CompiledDoshaModel, Dict]:
+    """
+    Load the dosha model bundle, or the legacy pickled DecisionTreeClassifier and
+    LabelEncoders when the model directory has not been re-exported yet
+    """
+    bundle_path = os.path.join(model_dir, BUNDLE_DIR)
+    if os.path.exists(os.path.join(bundle_path, MANIFEST_FILE)):
+        return load_bundle(bundle_path)
+
+    # joblib (and scikit-learn, when unpickling) are only imported when a model is needed
+    import joblib
+
+    return {
+        'model': joblib.load(os.path.join(model_dir, "dosha_model.pkl")),
+        'le_sleep': joblib.load(os.path.join(model_dir, "le_sleep.pkl")),
+        'le_digestion': joblib.load(os.path.join(model_dir, "le_digestion.pkl")),
+        'le_body': joblib.load(os.path.join(model_dir, "le_body.pkl")),
+        'le_target': joblib.load(os.path.join(model_dir, "le_target.pkl")),
+    }
+
+
+@lru_cache(maxsize=None)
+def get_dosha_model(model_dir: str = MODEL_DIR) -> Union[CompiledDoshaModel, Dict]:
+    """
+    Load the dosha model on first use and share it for the life of the process
+    """
+    return load_dosha_model(model_dir)
+
+
+def predict_dosha(dosha_model: Union[CompiledDoshaModel, Dict], age: float, weight: float, height: float,
+                  sleep: str, digestion: str, body_type: str) -> str:
+    """
+    Predict the dominant dosha for a single patient
+    """
+    if isinstance(dosha_model, CompiledDoshaModel):
+        return str(dosha_model.predict_batch([age], [weight], [height], [sleep], [digestion], [body_type])[0])
+
+    sleep = dosha_model['le_sleep'].transform([sleep])[0]
+    digestion = dosha_model['le_digestion'].transform([digestion])[0]
+    body_type = dosha_model['le_body'].transform([body_type])[0]
+
+    pred = dosha_model['model'].predict([[age, weight, height, sleep, digestion, body_type]])
+
+    return dosha_model['le_target'].inverse_transform(pred)[0]
+
+
+def predict_doshas(dosha_model: Union[CompiledDoshaModel, Dict], patients: List[Dict]) -> List[str]:
+    """
+    Predict the dominant dosha for many patients, each a dict of the FEATURES
+    """
+    if isinstance(dosha_model, CompiledDoshaModel):
+        columns = {feature: [patient[feature] for patient in patients] for feature in FEATURES}
+        return dosha_model.predict_batch(**columns).tolist()
+
+    return [predict_dosha(dosha_model, *(patient[feature] for feature in FEATURES)) for patient in patients]
@@ -0,0 +1,277 @@
+import argparse
+import json
+import os
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+DOSHAS = ['Vata', 'Pitta', 'Kapha']
+MACRO_COLUMNS = ['Calories', 'Protein (g)', 'Fats (g)', 'Carbs (g)']
+
+# Dosha effect symbols; anything else (blank, typos) is treated as neutral
+SYMBOL_CODES = {'-': -1, '=': 0, '+': 1}
+DIET_TYPES = ['veg', 'non-veg']
+
+# Bump whenever the on-disk layout written by compile_catalog changes
+CATALOG_FORMAT = "ayur-rasa-food-catalog"
+CATALOG_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+
+class FoodCatalog:
+    """
+    Columnar, typed food catalog. Categories are stored as small-int codes
+    (meal type, veg/non-veg, '+/-/=' per dosha), macros as float32, and index
+    arrays per meal type, dosha symbol and diet type are built once so filters
+    are O(matches) slices instead of full-table string comparisons. Each meal type
+    also keeps its rows sorted by calories, so calorie ranges are bisect queries.
+    """
+    def __init__(self, names: np.ndarray, meal_type_codes: np.ndarray, meal_types: List[str],
+                 diet_codes: np.ndarray, dosha_codes: np.ndarray, macros: np.ndarray,
+                 index: np.ndarray = None, calories: np.ndarray = None):
+        self.names = names
+        self.meal_type_codes = meal_type_codes
+        self.meal_types = meal_types
+        self.diet_codes = diet_codes
+        self.dosha_codes = dosha_codes
+        self.macros = macros
+        # Row labels of the source DataFrame, for mapping filtered frames back to rows
+        self.index = index if index is not None else np.arange(len(names))
+
+        self.meal_type_index = {
+            meal_type: np.flatnonzero(meal_type_codes == code)
+            for code, meal_type in enumerate(meal_types)
+        }
+        self.dosha_index = {
+            (dosha, symbol): np.flatnonzero(dosha_codes[:, col] == code)
+            for col, dosha in enumerate(DOSHAS)
+            for symbol, code in SYMBOL_CODES.items()
+        }
+        self.diet_index = {
+            diet_type: np.flatnonzero(diet_codes == code)
+            for code, diet_type in enumerate(DIET_TYPES)
+        }
+        
+        # Exact (float64) calories; macros are float32 and would round range bounds
+        self.calories = calories if calories is not None else macros[:, 0].astype(np.float64)
+        self.calorie_index = {}
+        for meal_type, positions in self.meal_type_index.items():
+            order = positions[np.argsort(self.calories[positions], kind='stable')]
+            self.calorie_index[meal_type] = (order, self.calories[order])
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "FoodCatalog":
+        """
+        Encode a foods DataFrame with the new_foods.csv / newnew_foods.csv schema
+        """
+        meal_type_codes, meal_types = pd.factorize(df['Meal Type'].astype(str).str.lower())
+
+        if 'type' in df.columns:
+            diet_codes = df['type'].map({diet_type: code for code, diet_type in enumerate(DIET_TYPES)})
+            diet_codes = diet_codes.fillna(-1).to_numpy(dtype=np.int8)
+        else:
+            diet_codes = np.full(len(df), -1, dtype=np.int8)
+
+        dosha_codes = np.stack([
+            df[dosha].map(SYMBOL_CODES).fillna(0).to_numpy(dtype=np.int8) for dosha in DOSHAS
+        ], axis=1).reshape(len(df), len(DOSHAS))
+
+        return cls(
+            names=df['Food Name'].to_numpy(dtype=object),
+            meal_type_codes=meal_type_codes.astype(np.int8),
+            meal_types=list(meal_types),
+            diet_codes=diet_codes,
+            dosha_codes=dosha_codes,
+            macros=df[MACRO_COLUMNS].to_numpy(dtype=np.float32),
+            index=df.index.to_numpy(),
+            calories=df['Calories'].to_numpy(dtype=np.float64)
+        )
+
+    @classmethod
+    def from_csv(cls, path: str) -> "FoodCatalog":
+        return cls.from_frame(pd.read_csv(path))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def meal_type_positions(self, meal_type: str) -> np.ndarray:
+        """
+        Row positions of a meal type (case-insensitive), in catalog order
+        """
+        return self.meal_type_index.get(meal_type.lower(), np.empty(0, dtype=np.intp))
+
+    def calorie_range(self, meal_type: str, low: float, high: float = np.inf) -> np.ndarray:
+        """
+        Row positions of a meal type with low <= Calories < high, in calorie order
+        """
+        order, calories = self.calorie_index.get(meal_type.lower(), (np.empty(0, dtype=np.intp), np.empty(0)))
+        start, stop = np.searchsorted(calories, [low, high], side='left')
+        return order[start:stop]
+    
+    def dosha_positions(self, dosha: str, symbols: str) -> np.ndarray:
+        """
+        Row positions whose effect on a dosha is any of the given symbols, e.g. '+='
+        """
+        return np.sort(np.concatenate([self.dosha_index[(dosha, symbol)] for symbol in symbols]))
+
+    def diet_positions(self, diet_type: str) -> np.ndarray:
+        """
+        Row positions labelled 'veg' or 'non-veg' in the catalog's type column
+        """
+        return self.diet_index.get(diet_type, np.empty(0, dtype=np.intp))
+
+    def macro(self, column: str) -> np.ndarray:
+        return self.macros[:, MACRO_COLUMNS.index(column)]
+
+    def symbols(self, positions: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Decode dosha codes back to '+/-/=' symbols for the given rows
+        """
+        decode = np.array(['-', '=', '+'], dtype=object)
+        return {dosha: decode[self.dosha_codes[positions, col] + 1] for col, dosha in enumerate(DOSHAS)}
+
+
+def compiled_path(csv_path: str) -> str:
+    """
+    Directory the compiled form of a foods CSV is written to, e.g. foods.csv -> foods.catalog
+    """
+    return os.path.splitext(csv_path)[0] + ".catalog"
+
+
+def write_string_table(directory: str, prefix: str, values: pd.Series) -> Dict:
+    """
+    Dictionary-encode a string column: int32 codes (-1 for missing) plus a table of the
+    distinct strings as one UTF-8 byte buffer and int64 offsets into it
+    """
+    codes, vocabulary = pd.factorize(values)
+    encoded = [value.encode("utf-8") for value in vocabulary]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(value) for value in encoded])
+
+    np.save(os.path.join(directory, f"{prefix}.codes.npy"), codes.astype(np.int32))
+    np.save(os.path.join(directory, f"{prefix}.strings.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(os.path.join(directory, f"{prefix}.offsets.npy"), offsets)
+    return {'kind': 'string', 'prefix': prefix}
+
+
+def read_string_table(directory: str, prefix: str) -> pd.Series:
+    """
+    Decode a dictionary-encoded string column; missing values (code -1) become NaN
+    """
+    codes = np.load(os.path.join(directory, f"{prefix}.codes.npy"), mmap_mode='r')
+    strings = np.load(os.path.join(directory, f"{prefix}.strings.npy"), mmap_mode='r')
+    offsets = np.load(os.path.join(directory, f"{prefix}.offsets.npy"))
+
+    # Only the distinct strings are converted; rows are gathered with one vectorized take
+    buffer = strings.tobytes()
+    vocabulary = pd.Index([buffer[start:end].decode("utf-8")
+                           for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())])
+    return pd.Series(vocabulary.take(np.asarray(codes), allow_fill=True, fill_value=np.nan))
+
+
+def compile_catalog(csv_path: str, out_dir: str = None) -> str:
+    """
+    Convert a foods CSV into the binary catalog format: one .npy file per numeric column,
+    dictionary-encoded string tables for text columns and a versioned manifest.
+    Numeric columns can then be memory-mapped zero-copy and shared between processes.
+    """
+    out_dir = out_dir or compiled_path(csv_path)
+    os.makedirs(out_dir, exist_ok=True)
+    df = pd.read_csv(csv_path)
+
+    columns = []
+    for col_idx, column in enumerate(df.columns):
+        prefix = f"col_{col_idx}"
+        values = df[column]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            np.save(os.path.join(out_dir, f"{prefix}.npy"), values.to_numpy())
+            entry = {'kind': 'numeric', 'prefix': prefix}
+        else:
+            entry = write_string_table(out_dir, prefix, values)
+        columns.append({'name': column, **entry})
+
+    manifest = {
+        'format': CATALOG_FORMAT,
+        'version': CATALOG_FORMAT_VERSION,
+        'rows': len(df),
+        'source': os.path.basename(csv_path),
+        'source_size': os.path.getsize(csv_path),
+        'columns': columns
+    }
+    # The manifest is written last and atomically, so a partial compile is never loaded
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return out_dir
+
+
+def load_compiled_frame(directory: str) -> pd.DataFrame:
+    """
+    Load a compiled catalog. Numeric columns stay memory-mapped (read-only, no copy);
+    string columns are rebuilt from their string tables.
+    """
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != CATALOG_FORMAT or manifest.get('version') != CATALOG_FORMAT_VERSION:
+        raise ValueError(f"{directory} is not a version {CATALOG_FORMAT_VERSION} food catalog; recompile it")
+
+    data = {}
+    for column in manifest['columns']:
+        if column['kind'] == 'numeric':
+            data[column['name']] = np.load(os.path.join(directory, f"{column['prefix']}.npy"), mmap_mode='r')
+        else:
+            data[column['name']] = read_string_table(directory, column['prefix'])
+
+    df = pd.DataFrame(data, copy=False)
+    if len(df) != manifest['rows']:
+        raise ValueError(f"{directory} has {len(df)} rows, manifest expects {manifest['rows']}")
+    return df
+
+
+def is_compiled_fresh(csv_path: str, directory: str) -> bool:
+    """
+    True if a compiled catalog exists, has the current format version and is newer than the CSV
+    """
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return False
+    if not os.path.exists(csv_path):
+        return True
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    return (manifest.get('format') == CATALOG_FORMAT
+            and manifest.get('version') == CATALOG_FORMAT_VERSION
+            and manifest.get('source_size') == os.path.getsize(csv_path)
+            and os.path.getmtime(manifest_path) >= os.path.getmtime(csv_path))
+
+
+def load_food_frame(path: str) -> pd.DataFrame:
+    """
+    Load a foods table from a CSV or a compiled catalog directory. For a CSV, its
+    compiled catalog is used instead when one exists and is fresher than the CSV.
+    """
+    if os.path.isdir(path):
+        return load_compiled_frame(path)
+
+    directory = compiled_path(path)
+    if is_compiled_fresh(path, directory):
+        return load_compiled_frame(directory)
+    return pd.read_csv(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a foods CSV into the memory-mappable catalog format")
+    parser.add_argument("csv", help="Foods CSV, e.g. newnew_foods.csv")
+    parser.add_argument("--out", help="Output directory (default: <csv name>.catalog)")
+    args = parser.parse_args()
+
+    out_dir = compile_catalog(args.csv, args.out)
+    print(f"Compiled {args.csv} -> {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
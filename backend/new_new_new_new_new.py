@@ -1,29 +1,196 @@
 import pandas as pd
-import pulp
 import numpy as np
-# from transformers import pipeline
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+import copy
+import json
+import os
 import re
-from typing import Dict, List, Tuple, Set
+import time
+from typing import Dict, Iterable, Iterator, List, Tuple, Set
 import warnings
+
+from food_catalog import FoodCatalog, load_food_frame
 warnings.filterwarnings('ignore')
 
+def _import_pulp():
+    """
+    Import PuLP on first solve; the closed-form selector never needs it
+    """
+    import pulp
+    return pulp
+
+# Per-process state for generate_weekly_plans workers
+_batch_planner = None
+_batch_filtered_foods = {}
+
+def _init_batch_worker(planner):
+    """
+    Receive the shared planner once per worker process
+    """
+    global _batch_planner
+    _batch_planner = planner
+    _batch_filtered_foods.clear()
+
+def _run_batch_plan(group_key, food_index, profile: Dict, plan_options: Dict) -> Dict:
+    """
+    Generate one patient's plan in a worker, reusing the filtered catalog of its group
+    """
+    if group_key not in _batch_filtered_foods:
+        _batch_filtered_foods[group_key] = _batch_planner.food_df.loc[food_index]
+    return _batch_planner.generate_weekly_plan(
+        **profile, filtered_foods=_batch_filtered_foods[group_key], **plan_options
+    )
+
+def _run_plan_day(day_labels: Dict[str, pd.Index], plan_args: Dict) -> Tuple[Dict, List[Dict]]:
+    """
+    Plan one day of a partitioned plan in a worker; returns its meals and solver log
+    """
+    day_candidates = {
+        meal_type: _batch_planner.food_df.loc[labels] for meal_type, labels in day_labels.items()
+    }
+    solver_log = []
+    return _batch_planner.plan_day(day_candidates, **plan_args, solver_log=solver_log), solver_log
+
+class MealTypeModel:
+    """
+    One-food-per-meal PuLP model over the foods of one meal type, built once per plan.
+    Consecutive days only differ in which foods are excluded, so each solve just updates
+    variable bounds and objective coefficients, warm-started from the previous choice.
+    With candidates (positions already known to fit the calorie window, e.g. from the
+    calorie index) only those foods get variables and the calorie constraints are dropped.
+    """
+    def __init__(self, meal_type: str, scores: np.ndarray, calorie_contributions: np.ndarray,
+                 calories_per_meal: float, candidates: np.ndarray = None):
+        pulp = _import_pulp()
+        self.meal_type = meal_type
+        self.candidates = candidates if candidates is not None else np.arange(len(scores))
+        self.scores = scores[self.candidates]
+        self.prob = pulp.LpProblem(f"AyurvedicMealPlanning_{meal_type}", pulp.LpMaximize)
+        self.variables = [pulp.LpVariable(f"Food_{pos}", cat="Binary") for pos in self.candidates.tolist()]
+        
+        if candidates is None:
+            # Calorie window (15% flexibility), as in solve_meal_lp
+            calorie_expr = pulp.LpAffineExpression(zip(self.variables, calorie_contributions.tolist()))
+            self.prob += calorie_expr >= calories_per_meal * 0.85, "MinCalories"
+            self.prob += calorie_expr <= calories_per_meal * 1.15, "MaxCalories"
+        self.prob += pulp.lpSum(self.variables) == 1, "ExactlyOneFood"
+        
+        self.last_choice = None
+    
+    def update(self, allowed: np.ndarray, penalties: np.ndarray):
+        """
+        Prepare the next solve: foods outside allowed are fixed to 0 and the objective
+        is lowered by penalties (both indexed by position among all the meal type's foods)
+        """
+        pulp = _import_pulp()
+        allowed = allowed[self.candidates]
+        for var, is_allowed in zip(self.variables, allowed.tolist()):
+            var.upBound = 1 if is_allowed else 0
+        self.prob.setObjective(pulp.LpAffineExpression(
+            zip(self.variables, (self.scores - penalties[self.candidates]).tolist())
+        ))
+        
+        # The previous day's food is a feasible start whenever it is still allowed
+        for var in self.variables:
+            var.varValue = None
+        if self.last_choice is not None and allowed[self.last_choice]:
+            for pos, var in enumerate(self.variables):
+                var.setInitialValue(1 if pos == self.last_choice else 0)
+    
+    def warm_startable(self, allowed: np.ndarray) -> bool:
+        return self.last_choice is not None and bool(allowed[self.candidates[self.last_choice]])
+    
+    def chosen(self) -> List[int]:
+        """
+        Positions (among all the meal type's foods) picked by the last successful solve
+        """
+        chosen = [pos for pos, var in enumerate(self.variables) if round(var.value() or 0) == 1]
+        self.last_choice = chosen[0] if chosen else None
+        return self.candidates[chosen].tolist()
+
 class AdvancedAyurvedicMealPlanner:
-    def __init__(self, food_data_path: str = "food.csv"):
+    def __init__(self, food_data_path: str = "food.csv", allergy_classifier=None,
+                 lazy_classifier: bool = True, allergy_cache_path: str = None,
+                 use_allergy_model: bool = False):
         """
-        Initialize the meal planner with food data and Ayurvedic knowledge
+        Initialize the meal planner with food data and Ayurvedic knowledge.
+        Allergies are matched by ingredient keywords unless use_allergy_model opts in to
+        zero-shot classification with the Hugging Face model (a download on first use).
+        allergy_classifier may be any zero-shot pipeline callable (e.g. a mock in tests)
+        and implies use_allergy_model; with lazy_classifier the model is only loaded once
+        a food/allergen pair is missing from the on-disk cache at allergy_cache_path.
+        food_data_path may be a CSV or a compiled catalog directory (see food_catalog.py);
+        a CSV's compiled catalog is used when it is fresher than the CSV.
         """
-        self.food_df = pd.read_csv(food_data_path)
-        self.allergy_classifier = None
-        self.setup_allergy_classifier()
+        self.food_df = load_food_frame(food_data_path)
+        
+        # Zero-shot allergy classification, memoized per (food, allergen, model)
+        self.allergy_model_id = "facebook/bart-large-mnli"
+        self.allergy_threshold = 0.7  # Confidence threshold
+        self.allergy_batch_size = 32
+        self.allergy_cache_path = allergy_cache_path
+        self.allergy_scores = self.load_allergy_cache()
+        self.use_allergy_model = use_allergy_model or allergy_classifier is not None
+        self.allergy_classifier = allergy_classifier
+        # Only a caller that asked for the model ever loads it, eagerly or on first need
+        wants_model = self.use_allergy_model and allergy_classifier is None
+        self.classifier_pending = wants_model and lazy_classifier
+        if wants_model and not lazy_classifier:
+            self.setup_allergy_classifier()
         
         # Standard portion size in grams (max 350g per meal)
         self.standard_portion = 250  # grams
         self.max_portion = 350  # grams
         
+        # Plan horizon: day labels, the main meals, and optional slots whose calorie
+        # target is a share of one main meal's (see plan_meal_types)
+        self.week_days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        self.main_meal_types = ['breakfast', 'lunch', 'dinner']
+        self.optional_meal_shares = {'snack': 0.3, 'dessert': 0.2}
+        
+        # Solver engine and limits (see configure_solver); each plan keeps its own solver log
+        self._solver_backends = None
+        self.configure_solver()
+        
+        # Combination meals: 2-4 items with continuous portions (see solve_meal_combination)
+        self.min_meal_items = 2
+        self.max_meal_items = 4
+        self.min_item_portion = 50  # grams
+        self.max_meal_portion = 2 * self.max_portion  # grams, all items together
+        self.combination_candidates = 20  # best-scoring foods offered to the MILP
+        self.combination_macro_candidates = 5  # extra foods per macro, by grams per calorie
+        
+        # Order of dosha columns in score matrices
+        self.doshas = ['Vata', 'Pitta', 'Kapha']
+        
         # Track used foods to avoid repetition
         self.used_foods = set()
         
+        # Precomputed per-food dosha scores, built lazily from food_df
+        self._score_table = None
+        self._score_table_source = None
+        
+        # Columnar catalog with meal-type and dosha indexes, rebuilt if food_df is replaced
+        self.catalog = FoodCatalog.from_frame(self.food_df)
+        self._catalog_source = self.food_df
+        self._catalog_rows = (None, None)
+        
+        # Per-context score vectors over the whole catalog and filter_foods results,
+        # reused across plans and incremental re-plans of the same patient
+        self._score_vectors = {}
+        self._filtered_foods = {}
+        self._plan_cache_source = None
+        self.max_cached_filters = 32
+        self.max_cached_score_vectors = 1024
+        
+        # Profile fields that change the calorie targets, dosha weights or horizon (days,
+        # meal slots, no-repeat window) of every meal; replans then redo the whole plan
+        self.replan_all_fields = ('age', 'height', 'weight', 'gender', 'activity_level',
+                                  'season', 'vikriti', 'use_solver', 'mode', 'combination',
+                                  'n_days', 'meal_types', 'extras', 'no_repeat_days')
+        
         # Taste to dosha mappings
         self.taste_effects = {
             'sweet': {'Vata': '-', 'Pitta': '-', 'Kapha': '+'},
@@ -62,6 +229,29 @@ class AdvancedAyurvedicMealPlanner:
             'apple': ['sweet', 'astringent']
         }
         
+        # Ingredient keywords that indicate an allergen in a food name
+        self.allergy_keywords = {
+            'nuts': ['almond', 'cashew', 'walnut', 'pistachio', 'nut'],
+            'dairy': ['milk', 'cheese', 'yogurt', 'butter', 'paneer', 'ghee', 'cream'],
+            'gluten': ['wheat', 'gluten', 'atta', 'maida'],
+            'seafood': ['fish', 'prawn', 'shrimp', 'seafood'],
+            'eggs': ['egg', 'andaa']
+        }
+        
+        # Food x allergen match columns, built once per catalog
+        self._allergen_index = {}
+        self._allergen_index_source = None
+        
+        # Taste index: each food's tastes as a bitmask over taste_order, and the
+        # normalized dosha impact of every possible taste combination
+        self.taste_order = list(self.taste_effects)
+        self.taste_bits = {taste: 1 << bit for bit, taste in enumerate(self.taste_order)}
+        self.ingredient_masks = {
+            ingredient: sum(self.taste_bits[taste] for taste in set(tastes))
+            for ingredient, tastes in self.food_tastes.items()
+        }
+        self.taste_impact_table = self.build_taste_impact_table()
+        
         # Allergy substitution mappings
         self.allergy_substitutions = {
             'dairy': {
@@ -107,19 +297,88 @@ class AdvancedAyurvedicMealPlanner:
         
     def setup_allergy_classifier(self):
         """
-        Set up the Hugging Face model for allergy classification
+        Set up the Hugging Face model for allergy classification, if opted in
         """
+        self.classifier_pending = False
+        if not self.use_allergy_model:
+            self.allergy_classifier = None
+            return
+        
         try:
+            from transformers import pipeline
+            
             # Using a zero-shot classification model to check if food contains allergens
             self.allergy_classifier = pipeline(
                 "zero-shot-classification",
-                model="facebook/bart-large-mnli"
+                model=self.allergy_model_id
             )
         except Exception as e:
             print(f"Error loading Hugging Face model: {e}")
             print("Using fallback keyword-based allergy detection")
             self.allergy_classifier = None
     
+    def load_allergy_cache(self) -> Dict[Tuple[str, str, str], float]:
+        """
+        Load cached zero-shot allergy scores from disk
+        """
+        if not self.allergy_cache_path or not os.path.exists(self.allergy_cache_path):
+            return {}
+        
+        with open(self.allergy_cache_path) as f:
+            records = json.load(f)
+        return {(r['food'], r['allergen'], r['model']): r['score'] for r in records}
+    
+    def save_allergy_cache(self):
+        """
+        Persist zero-shot allergy scores so later runs skip the model
+        """
+        if not self.allergy_cache_path:
+            return
+        
+        records = [
+            {'food': food, 'allergen': allergen, 'model': model, 'score': score}
+            for (food, allergen, model), score in self.allergy_scores.items()
+        ]
+        tmp_path = f"{self.allergy_cache_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(records, f)
+        os.replace(tmp_path, self.allergy_cache_path)
+    
+    def classify_allergens(self, food_names: List[str], allergies: List[str]) -> np.ndarray:
+        """
+        Zero-shot allergen scores for every (food, allergy) pair, shaped foods x allergies.
+        Only pairs missing from the cache are sent to the model, in batches.
+        Returns None when no classifier is available.
+        """
+        labels = [allergy.lower() for allergy in allergies]
+        unique_names = list(dict.fromkeys(food_names))
+        uncached = [
+            name for name in unique_names
+            if any((name, label, self.allergy_model_id) not in self.allergy_scores for label in labels)
+        ]
+        
+        if uncached:
+            if self.classifier_pending:
+                self.setup_allergy_classifier()
+            if not self.allergy_classifier:
+                return None
+            
+            for start in range(0, len(uncached), self.allergy_batch_size):
+                batch = uncached[start:start + self.allergy_batch_size]
+                results = self.allergy_classifier(batch, candidate_labels=labels, multi_label=True)
+                if isinstance(results, dict):
+                    results = [results]
+                for name, result in zip(batch, results):
+                    for label, score in zip(result['labels'], result['scores']):
+                        self.allergy_scores[(name, label, self.allergy_model_id)] = float(score)
+            
+            self.save_allergy_cache()
+        
+        return np.array([
+            [self.allergy_scores[(name, label, self.allergy_model_id)] for label in labels]
+            for name in food_names
+        ]).reshape(len(food_names), len(labels))
+    
     def determine_age_dosha(self, age: int) -> Dict[str, float]:
         """
         Determine dosha predominance based on age
@@ -158,39 +417,243 @@ class AdvancedAyurvedicMealPlanner:
         
         return time_impact.get(meal_time.lower(), {'Vata': 1.0, 'Pitta': 1.0, 'Kapha': 1.0})
     
-    def estimate_food_tastes(self, food_name: str) -> List[str]:
+    def calculate_dosha_weights(self, vikriti: str, age: int, season: str, meal_type: str) -> Dict[str, float]:
         """
-        Estimate the tastes of a food based on its ingredients
+        Combine vikriti, age, season and time of day into per-dosha objective weights
         """
-        tastes = set()
-        food_lower = food_name.lower()
+        age_dosha = self.determine_age_dosha(age)
+        seasonal_dosha = self.determine_seasonal_dosha(season)
+        time_dosha = self.determine_time_dosha(meal_type)
         
-        for ingredient, ingredient_tastes in self.food_tastes.items():
-            if ingredient in food_lower:
-                tastes.update(ingredient_tastes)
+        # Base weights (prioritize balancing vikriti)
+        dosha_weights = {
+            'Vata': 1.0,
+            'Pitta': 1.0,
+            'Kapha': 1.0
+        }
+        
+        # Increase weight for imbalanced doshas (vikriti)
+        if vikriti:
+            for dosha in vikriti.split(','):
+                dosha = dosha.strip()
+                if dosha in dosha_weights:
+                    dosha_weights[dosha] = 2.0  # Higher priority to balance vikriti
+        
+        # Apply age, season, and time influences
+        for dosha in dosha_weights:
+            dosha_weights[dosha] *= age_dosha[dosha] * seasonal_dosha[dosha] * time_dosha[dosha]
+        
+        return dosha_weights
+    
+    def build_taste_impact_table(self) -> np.ndarray:
+        """
+        Normalized Vata/Pitta/Kapha impact for every taste bitmask, shaped (2**tastes, 3)
+        """
+        effects = np.array([
+            [{'+': 1, '-': -1}.get(self.taste_effects[taste][dosha], 0) for dosha in self.doshas]
+            for taste in self.taste_order
+        ], dtype=float)
+        
+        masks = np.arange(1 << len(self.taste_order))
+        present = (masks[:, None] >> np.arange(len(self.taste_order))) & 1
+        impact = present @ effects
+        
+        # Normalize the impact
+        total = np.abs(impact).sum(axis=1, keepdims=True)
+        return impact / np.where(total == 0, 1, total)
+    
+    def food_taste_mask(self, food_name: str) -> int:
+        """
+        Taste bitmask of a food from whole-word ingredient matches in its name
+        """
+        mask = 0
+        for token in re.findall(r"[a-z]+", food_name.lower()):
+            # Accept simple plurals ("mangoes", "apples") but not substrings ("licorice")
+            for word in (token, token[:-1] if token.endswith('s') else None,
+                         token[:-2] if token.endswith('es') else None):
+                mask |= self.ingredient_masks.get(word, 0)
         
         # Default to sweet if no tastes identified
-        return list(tastes) if tastes else ['sweet']
+        return mask or self.taste_bits['sweet']
+    
+    def taste_mask_labels(self, mask: int) -> List[str]:
+        """
+        Taste names contained in a bitmask
+        """
+        return [taste for taste in self.taste_order if mask & self.taste_bits[taste]]
+    
+    def estimate_food_tastes(self, food_name: str) -> List[str]:
+        """
+        Estimate the tastes of a food based on its ingredients
+        """
+        return self.taste_mask_labels(self.food_taste_mask(food_name))
     
     def calculate_taste_impact(self, tastes: List[str]) -> Dict[str, float]:
         """
         Calculate the dosha impact of a combination of tastes
         """
-        impact = {'Vata': 0, 'Pitta': 0, 'Kapha': 0}
+        mask = sum(self.taste_bits[taste] for taste in set(tastes))
+        return dict(zip(self.doshas, self.taste_impact_table[mask].tolist()))
+    
+    def build_score_table(self, food_df: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
+        """
+        Precompute a foods x doshas score matrix from the '+/-/=' symbols and taste impacts.
+        A food's objective for a meal is then the dot product with the dosha weights.
+        """
+        # Symbolic effect: decreasing a dosha scores +1, increasing it -1, neutral 0
+        symbols = food_df[self.doshas].to_numpy()
+        symbol_scores = np.where(symbols == '-', 1.0, np.where(symbols == '+', -1.0, 0.0))
         
-        for taste in tastes:
-            for dosha, effect in self.taste_effects[taste].items():
-                if effect == '+':
-                    impact[dosha] += 1
-                elif effect == '-':
-                    impact[dosha] -= 1
+        # Taste effect (positive impact means the food aggravates the dosha)
+        taste_masks = np.array([self.food_taste_mask(name) for name in food_df['Food Name']], dtype=np.uint8)
+        taste_impacts = self.taste_impact_table[taste_masks].reshape(len(food_df), len(self.doshas))
         
-        # Normalize the impact
-        total = sum(abs(val) for val in impact.values()) or 1
-        for dosha in impact:
-            impact[dosha] = impact[dosha] / total
-            
-        return impact
+        mask_labels = {mask: ', '.join(self.taste_mask_labels(mask)) for mask in set(taste_masks.tolist())}
+        taste_labels = [mask_labels[mask] for mask in taste_masks.tolist()]
+        return symbol_scores - taste_impacts, taste_labels
+    
+    def get_score_table(self, foods: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
+        """
+        Return score matrix rows for a subset of food_df, building the table once per catalog
+        """
+        if self._score_table is None or self._score_table_source is not self.food_df:
+            self._score_table = self.build_score_table(self.food_df)
+            self._score_table_source = self.food_df
+        
+        positions = self.food_df.index.get_indexer(foods.index)
+        if (positions < 0).any():
+            # Foods that did not come from this catalog are scored on the fly
+            return self.build_score_table(foods)
+        
+        scores, taste_labels = self._score_table
+        return scores[positions], [taste_labels[pos] for pos in positions]
+    
+    def plan_caches(self) -> Tuple[Dict, Dict]:
+        """
+        Score vector and filtered catalog caches, emptied whenever food_df is replaced
+        """
+        if self._plan_cache_source is not self.food_df:
+            self._score_vectors = {}
+            self._filtered_foods = {}
+            self._plan_cache_source = self.food_df
+        return self._score_vectors, self._filtered_foods
+    
+    def meal_score_vector(self, vikriti: str, age: int, season: str, meal_type: str) -> np.ndarray:
+        """
+        Dosha balancing score of every catalog food for one meal context, cached per context
+        """
+        score_vectors, _ = self.plan_caches()
+        key = (vikriti, age, season, meal_type)
+        if key not in score_vectors:
+            if len(score_vectors) >= self.max_cached_score_vectors:
+                score_vectors.pop(next(iter(score_vectors)))
+            score_table, _ = self.get_score_table(self.food_df)
+            dosha_weights = self.calculate_dosha_weights(vikriti, age, season, meal_type)
+            score_vectors[key] = score_table @ np.array([dosha_weights[dosha] for dosha in self.doshas])
+        return score_vectors[key]
+    
+    def get_filtered_foods(self, dietary_pref: str, allergies: List[str]) -> pd.DataFrame:
+        """
+        filter_foods, memoized per (dietary_pref, allergies). The same frame is returned on
+        every hit, so the meal-type row masks built from it are reused as well.
+        """
+        _, filtered_foods = self.plan_caches()
+        allergies = allergies or []
+        key = (dietary_pref.lower(), tuple(sorted(allergy.lower() for allergy in allergies)))
+        if key not in filtered_foods:
+            if len(filtered_foods) >= self.max_cached_filters:
+                filtered_foods.pop(next(iter(filtered_foods)))
+            filtered_foods[key] = self.filter_foods(dietary_pref, allergies)
+        return filtered_foods[key]
+    
+    def get_catalog(self) -> FoodCatalog:
+        """
+        Return the typed catalog for food_df, re-encoding it if food_df was replaced
+        """
+        if self._catalog_source is not self.food_df:
+            self.catalog = FoodCatalog.from_frame(self.food_df)
+            self._catalog_source = self.food_df
+        return self.catalog
+    
+    def catalog_rows(self, foods: pd.DataFrame) -> np.ndarray:
+        """
+        Boolean mask over catalog rows present in foods, or None if foods did not come
+        from food_df. Cached for the last frame, which is reused by every meal of a plan.
+        The cache is one (source, rows) tuple, read and replaced in single assignments,
+        so concurrent plans never return another frame's rows.
+        """
+        source, rows = self._catalog_rows
+        if source is foods:
+            return rows
+        
+        positions = self.food_df.index.get_indexer(foods.index)
+        if (positions < 0).any():
+            rows = None
+        else:
+            rows = np.zeros(len(self.get_catalog()), dtype=bool)
+            rows[positions] = True
+        self._catalog_rows = (foods, rows)
+        return rows
+    
+    def calorie_window_positions(self, meal_type: str, calories_per_meal: float) -> np.ndarray:
+        """
+        Catalog positions of a meal type whose calorie contribution at its portion size lies
+        in the 15% window, in catalog order; exactly the foods in_calorie_window (and the
+        MinCalories/MaxCalories constraints) accept.
+        
+        A food's contribution is min(calories_per_meal, Calories * max_portion /
+        standard_portion) up to portion rounding, so feasibility is a Calories range:
+        Calories >= 0.85 * calories_per_meal * standard_portion / max_portion. That range is
+        a bisect query on the catalog's calorie index; only foods near its edges (and
+        implausibly caloric ones, where rounding could matter) are checked exactly.
+        """
+        catalog = self.get_catalog()
+        if calories_per_meal <= 0:
+            edge_positions, inner_positions = catalog.meal_type_positions(meal_type), np.empty(0, dtype=np.intp)
+        else:
+            low = 0.85 * calories_per_meal * self.standard_portion / self.max_portion
+            high = 2 * calories_per_meal * self.standard_portion
+            low_edge, high_edge = low * (1 - 1e-9), low * (1 + 1e-9)
+            inner_positions = catalog.calorie_range(meal_type, high_edge, high)
+            edge_positions = np.concatenate([catalog.calorie_range(meal_type, low_edge, high_edge),
+                                             catalog.calorie_range(meal_type, high)])
+        
+        edge_calories = catalog.calories[edge_positions]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            contributions = edge_calories / self.standard_portion * self.calculate_portion_sizes(
+                edge_calories, calories_per_meal
+            )
+        edge_positions = edge_positions[self.in_calorie_window(contributions, calories_per_meal)]
+        return np.sort(np.concatenate([inner_positions, edge_positions]))
+    
+    def select_meal_type(self, foods: pd.DataFrame, meal_type: str, exclude: Set[str] = None,
+                         calories_per_meal: float = None) -> pd.DataFrame:
+        """
+        Rows of foods for a meal type (case-insensitive), optionally excluding food names.
+        Uses the catalog's meal-type index rather than comparing every row's string.
+        With calories_per_meal, only foods inside that target's calorie window are kept,
+        read from the catalog's calorie index (see calorie_window_positions).
+        """
+        catalog = self.get_catalog()
+        rows = self.catalog_rows(foods)
+        if rows is None:
+            selected = foods[foods['Meal Type'].str.lower() == meal_type.lower()]
+            if calories_per_meal is not None:
+                calories = selected['Calories'].to_numpy(dtype=float)
+                contributions = calories / self.standard_portion * self.calculate_portion_sizes(
+                    calories, calories_per_meal
+                )
+                selected = selected[self.in_calorie_window(contributions, calories_per_meal)]
+            return selected[~selected['Food Name'].isin(exclude)] if exclude else selected
+        
+        if calories_per_meal is not None:
+            positions = self.calorie_window_positions(meal_type, calories_per_meal)
+        else:
+            positions = catalog.meal_type_positions(meal_type)
+        positions = positions[rows[positions]]
+        if exclude:
+            positions = positions[~pd.Index(catalog.names[positions]).isin(exclude)]
+        return self.food_df.iloc[positions]
     
     def check_allergy(self, food_name: str, allergies: List[str]) -> bool:
         """
@@ -199,44 +662,55 @@ class AdvancedAyurvedicMealPlanner:
         if not allergies:
             return False
             
-        if self.allergy_classifier:
+        if self.allergy_classifier or self.classifier_pending:
             try:
                 # Use the model to classify if the food contains allergens
-                result = self.allergy_classifier(
-                    food_name,
-                    candidate_labels=allergies,
-                    multi_label=True
-                )
-                # If any allergy has a score above threshold, consider it allergic
-                for label, score in zip(result['labels'], result['scores']):
-                    if score > 0.7:  # Confidence threshold
-                        return True
-                return False
+                scores = self.classify_allergens([food_name], allergies)
+                if scores is not None:
+                    # If any allergy has a score above threshold, consider it allergic
+                    return bool((scores > self.allergy_threshold).any())
             except Exception as e:
                 print(f"Error using allergy classifier: {e}. Falling back to keyword matching")
         
         # Fallback: simple keyword matching
         food_lower = food_name.lower()
         for allergy in allergies:
-            if allergy.lower() in food_lower:
+            if self.allergen_pattern(allergy).search(food_lower):
                 return True
-                
-            # Common ingredient mappings
-            allergy_mappings = {
-                'nuts': ['almond', 'cashew', 'walnut', 'pistachio', 'nut'],
-                'dairy': ['milk', 'cheese', 'yogurt', 'butter', 'paneer', 'ghee', 'cream'],
-                'gluten': ['wheat', 'gluten', 'atta', 'maida'],
-                'seafood': ['fish', 'prawn', 'shrimp', 'seafood'],
-                'eggs': ['egg', 'andaa']
-            }
-            
-            if allergy.lower() in allergy_mappings:
-                for keyword in allergy_mappings[allergy.lower()]:
-                    if keyword in food_lower:
-                        return True
         
         return False
     
+    def allergen_pattern(self, allergy: str) -> re.Pattern:
+        """
+        Compiled pattern matching an allergy name or any of its ingredient keywords
+        """
+        allergy = allergy.lower()
+        keywords = [allergy] + self.allergy_keywords.get(allergy, [])
+        return re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+    
+    def allergen_mask(self, allergies: List[str]) -> np.ndarray:
+        """
+        Boolean mask over food_df rows of foods matching any of the allergies by keyword.
+        Each allergen column is computed once per catalog and reused for every filter.
+        """
+        if self._allergen_index_source is not self.food_df:
+            self._allergen_index = {}
+            self._allergen_index_source = self.food_df
+        
+        food_names = None
+        mask = np.zeros(len(self.food_df), dtype=bool)
+        for allergy in allergies:
+            allergy = allergy.lower()
+            if allergy not in self._allergen_index:
+                if food_names is None:
+                    food_names = self.food_df['Food Name'].str.lower()
+                self._allergen_index[allergy] = food_names.str.contains(
+                    self.allergen_pattern(allergy), na=False
+                ).to_numpy()
+            mask |= self._allergen_index[allergy]
+        
+        return mask
+    
     def generate_allergy_warnings(self, food_name: str, allergies: List[str]) -> List[str]:
         """
         Generate specific warnings and substitutions for foods that might contain allergens
@@ -294,12 +768,19 @@ class AdvancedAyurvedicMealPlanner:
         
         # Filter by allergies
         if allergies:
-            allergic_foods = []
-            for _, row in df.iterrows():
-                if self.check_allergy(row['Food Name'], allergies):
-                    allergic_foods.append(row['Food Name'])
+            allergic = None
+            if self.allergy_classifier or self.classifier_pending:
+                try:
+                    # One batched, cached classifier pass over the whole candidate list
+                    scores = self.classify_allergens(df['Food Name'].tolist(), allergies)
+                    if scores is not None:
+                        allergic = (scores > self.allergy_threshold).any(axis=1)
+                except Exception as e:
+                    print(f"Error using allergy classifier: {e}. Falling back to keyword matching")
             
-            df = df[~df['Food Name'].isin(allergic_foods)]
+            if allergic is None:
+                allergic = self.allergen_mask(allergies)[self.food_df.index.get_indexer(df.index)]
+            df = df[~allergic]
         
         return df
     
@@ -335,6 +816,16 @@ class AdvancedAyurvedicMealPlanner:
         
         return daily_calories, calories_per_meal
     
+    def calculate_macro_targets(self, weight: float, daily_calories: float) -> Dict[str, float]:
+        """
+        Daily protein, fat and carbohydrate targets in grams
+        """
+        protein = weight * 1.2
+        fats = daily_calories * 0.25 / 9
+        carbs = (daily_calories - (protein * 4 + fats * 9)) / 4
+        
+        return {'protein': protein, 'fats': fats, 'carbs': carbs}
+    
     def calculate_portion_size(self, food_calories: float, meal_calories: float) -> float:
         """
         Calculate portion size in grams based on calorie content
@@ -347,250 +838,1312 @@ class AdvancedAyurvedicMealPlanner:
         
         return round(portion, 1)
     
+    def calculate_portion_sizes(self, food_calories: np.ndarray, meal_calories: float) -> np.ndarray:
+        """
+        Vectorized calculate_portion_size over an array of food calorie values
+        """
+        portions = (meal_calories / food_calories) * self.standard_portion
+        return np.round(np.minimum(portions, self.max_portion), 1)
+    
     def optimize_meals(self, filtered_foods: pd.DataFrame, prakriti: str, vikriti: str, 
                       calories_per_meal: float, season: str, meal_type: str, age: int, 
-                      weekly_used_foods: Set[str], day_idx: int) -> List[Dict]:
+                      weekly_used_foods: Set[str], day_idx: int, use_solver: bool = False,
+                      combination: bool = False, macro_targets: Dict[str, float] = None,
+                      meal_models: Dict[str, MealTypeModel] = None,
+                      solver_log: List[Dict] = None) -> List[Dict]:
         """
-        Use linear programming to optimize meal selection based on advanced dosha balance
+        Optimize meal selection based on advanced dosha balance.
+        Picking exactly one food under a calorie window is solved directly with a
+        masked argmax; use_solver forces the equivalent PuLP model instead.
+        combination=True picks several complementary foods with their own portions,
+        meeting the per-meal macro_targets as closely as possible. With use_solver and a
+        meal_models dict, one MealTypeModel per meal type is built and reused across days.
+        Solver calls are appended to solver_log, the calling plan's log, when given.
         """
+        if use_solver and not combination and meal_models is not None:
+            return self.optimize_meal_with_model(
+                meal_models, filtered_foods, vikriti, calories_per_meal, season, meal_type, age,
+                weekly_used_foods, solver_log=solver_log
+            )
+        
+        # One-food meals only ever pick an unused food inside the calorie window, so when
+        # there is one, score just those (a calorie-index range query) instead of every food
+        if not use_solver and not combination:
+            window_foods = self.select_meal_type(filtered_foods, meal_type, exclude=weekly_used_foods,
+                                                 calories_per_meal=calories_per_meal)
+            if not window_foods.empty:
+                return self.optimize_meal_candidates(
+                    window_foods, vikriti, calories_per_meal, season, meal_type, age, set()
+                )
+        
         # First, try to find foods that haven't been used yet
-        available_foods = filtered_foods[~filtered_foods['Food Name'].isin(weekly_used_foods)]
-        meal_type_foods = available_foods[available_foods['Meal Type'].str.lower() == meal_type.lower()]
+        meal_type_foods = self.select_meal_type(filtered_foods, meal_type, exclude=weekly_used_foods)
         
         # If no unused foods available for this meal type, use all foods for this meal type
         if meal_type_foods.empty:
-            meal_type_foods = filtered_foods[filtered_foods['Meal Type'].str.lower() == meal_type.lower()]
+            meal_type_foods = self.select_meal_type(filtered_foods, meal_type)
         
         # If still no foods available, return empty
         if meal_type_foods.empty:
             return [], 0
         
+        return self.optimize_meal_candidates(
+            meal_type_foods, vikriti, calories_per_meal, season, meal_type, age, weekly_used_foods,
+            use_solver=use_solver, combination=combination, macro_targets=macro_targets,
+            solver_log=solver_log
+        )
+    
+    def optimize_meal_candidates(self, meal_type_foods: pd.DataFrame, vikriti: str, calories_per_meal: float,
+                                 season: str, meal_type: str, age: int, weekly_used_foods: Set[str],
+                                 use_solver: bool = False, combination: bool = False,
+                                 macro_targets: Dict[str, float] = None,
+                                 solver_log: List[Dict] = None) -> Tuple[List[Dict], float]:
+        """
+        Pick a meal from a meal type's candidate foods, as optimize_meals does once the
+        candidates are chosen. Foods in weekly_used_foods are penalized.
+        """
+        scores, calorie_contributions, taste_labels = self.score_meal_candidates(
+            meal_type_foods, vikriti, age, season, meal_type, calories_per_meal
+        )
+        
+        # Apply penalty for foods that have been used in the week
+        # (very high penalty to prevent selection)
+        if weekly_used_foods:
+            scores = scores - 10.0 * meal_type_foods['Food Name'].isin(weekly_used_foods).to_numpy()
+        
+        # (position, portion) pairs; a portion of None means calculate_portion_size
+        selection = None
+        if combination:
+            selection = self.solve_meal_combination(
+                meal_type_foods, scores, calories_per_meal, macro_targets or {}, solver_log=solver_log
+            )
+        if selection is None:
+            if use_solver:
+                selected_positions = self.solve_meal_lp(scores, calorie_contributions, calories_per_meal,
+                                                        solver_log=solver_log)
+            else:
+                selected_positions = self.select_single_food(scores, calorie_contributions, calories_per_meal)
+            selection = [(pos, None) for pos in selected_positions]
+        
+        # Extract the solution
+        selected_foods = []
+        total_calories = 0
+        
+        for pos, portion in selection:
+            food_entry, food_calories = self.build_food_entry(
+                meal_type_foods.iloc[pos], calories_per_meal, taste_labels[pos], portion
+            )
+            total_calories += food_calories
+            selected_foods.append(food_entry)
+        
+        return selected_foods, round(total_calories, 1)
+    
+    def optimize_meal_with_model(self, meal_models: Dict[str, MealTypeModel], filtered_foods: pd.DataFrame,
+                                 vikriti: str, calories_per_meal: float, season: str, meal_type: str,
+                                 age: int, weekly_used_foods: Set[str],
+                                 solver_log: List[Dict] = None) -> Tuple[List[Dict], float]:
+        """
+        optimize_meals(use_solver=True) through a per-meal-type model kept in meal_models.
+        Candidates match optimize_meals: unused foods, or every food once all are used.
+        """
+        meal_type_foods = self.select_meal_type(filtered_foods, meal_type)
+        if meal_type_foods.empty:
+            return [], 0
+        
+        scores, calorie_contributions, taste_labels = self.score_meal_candidates(
+            meal_type_foods, vikriti, age, season, meal_type, calories_per_meal
+        )
+        model = meal_models.get(meal_type)
+        if model is None:
+            # Only foods inside the calorie window (a calorie-index range query) get variables
+            window_foods = self.select_meal_type(filtered_foods, meal_type, calories_per_meal=calories_per_meal)
+            candidates = np.flatnonzero(meal_type_foods.index.isin(window_foods.index))
+            model = meal_models[meal_type] = MealTypeModel(
+                meal_type, scores, calorie_contributions, calories_per_meal,
+                candidates if len(candidates) else None
+            )
+        
+        used = meal_type_foods['Food Name'].isin(weekly_used_foods).to_numpy()
+        allowed = ~used if not used.all() else np.ones(len(used), dtype=bool)
+        warm_start = model.warm_startable(allowed)
+        model.update(allowed, 10.0 * used)
+        
+        if self.solve_model(model.prob, f"meal_model:{meal_type}", warm_start=warm_start, solver_log=solver_log):
+            selected_positions = model.chosen()
+        else:
+            # Timed out or failed: the closed-form selector over the same candidates
+            candidates = np.flatnonzero(allowed)
+            selected_positions = [int(candidates[pos]) for pos in self.select_single_food(
+                (scores - 10.0 * used)[candidates], calorie_contributions[candidates], calories_per_meal
+            )]
+        
+        selected_foods = []
+        total_calories = 0
+        for pos in selected_positions:
+            food_entry, food_calories = self.build_food_entry(
+                meal_type_foods.iloc[pos], calories_per_meal, taste_labels[pos]
+            )
+            total_calories += food_calories
+            selected_foods.append(food_entry)
+        
+        return selected_foods, round(total_calories, 1)
+    
+    def configure_solver(self, engine: str = "auto", time_limit: float = 10.0, threads: int = None,
+                         gap: float = None, msg: bool = False):
+        """
+        Configure every PuLP solve. engine is "auto" or one of available_solver_engines()
+        ("cbc", "highs", "glpk"); time_limit is in seconds per solve; gap is the relative
+        MIP gap (None keeps each model's own); msg shows solver logs. A solve that times
+        out without a solution falls back to the heuristic selector.
+        """
+        if engine != "auto" and engine not in self.available_solver_engines():
+            raise ValueError(f"Solver engine '{engine}' is not available; "
+                             f"choose from {['auto'] + self.available_solver_engines()}")
+        self.solver_engine = engine
+        self.solver_time_limit = time_limit
+        self.solver_threads = threads
+        self.solver_gap = gap
+        self.solver_msg = msg
+    
+    def solver_backends(self) -> Dict[str, type]:
+        """
+        PuLP solver class per locally available engine; HiGHS runs in-process when
+        highspy is installed and through its command-line tool otherwise
+        """
+        if self._solver_backends is None:
+            pulp = _import_pulp()
+            candidates = {
+                'cbc': [pulp.PULP_CBC_CMD],
+                'highs': [pulp.HiGHS, pulp.HiGHS_CMD],
+                'glpk': [pulp.GLPK_CMD]
+            }
+            self._solver_backends = {}
+            for engine, solver_classes in candidates.items():
+                available = [cls for cls in solver_classes if cls(msg=False).available()]
+                if available:
+                    self._solver_backends[engine] = available[0]
+        return self._solver_backends
+    
+    def available_solver_engines(self) -> List[str]:
+        return list(self.solver_backends())
+    
+    def resolve_solver_engine(self) -> str:
+        """
+        The configured engine; "auto" prefers in-process HiGHS, then CBC, then the HiGHS
+        command-line tool, then GLPK
+        """
+        if self.solver_engine != "auto":
+            return self.solver_engine
+        backends = self.solver_backends()
+        if backends.get('highs') is _import_pulp().HiGHS:
+            return 'highs'
+        if 'cbc' in backends:
+            return 'cbc'
+        if not backends:
+            raise RuntimeError("No MILP solver is available to PuLP")
+        return next(iter(backends))
+    
+    def make_solver(self, warm_start: bool = False, gap: float = None):
+        """
+        Solver instance for one solve with the configured engine and limits.
+        gap is the model's default MIP gap, overridden by a configured solver_gap.
+        """
+        engine = self.resolve_solver_engine()
+        solver_cls = self.solver_backends()[engine]
+        gap = self.solver_gap if self.solver_gap is not None else gap
+        
+        if engine == 'glpk':
+            # GLPK takes the gap on its command line and has no threads or warm starts
+            return solver_cls(msg=self.solver_msg, timeLimit=self.solver_time_limit,
+                              options=['--mipgap', str(gap)] if gap is not None else None)
+        
+        options = {'gapRel': gap, 'threads': self.solver_threads}
+        if solver_cls is not _import_pulp().HiGHS:
+            # In-process HiGHS takes no MIP start
+            options['warmStart'] = warm_start
+        return solver_cls(msg=self.solver_msg, timeLimit=self.solver_time_limit,
+                          **{key: value for key, value in options.items() if value is not None})
+    
+    def solve_model(self, prob, model: str, warm_start: bool = False, gap: float = None,
+                    solver_log: List[Dict] = None) -> bool:
+        """
+        Solve a PuLP problem with the configured solver, logging the call to solver_log.
+        Returns whether a solution is available; an incumbent found before the time
+        limit counts, a time-out with none does not.
+        """
+        pulp = _import_pulp()
+        solver = self.make_solver(warm_start, gap)
+        start = time.perf_counter()
+        try:
+            prob.solve(solver)
+            solved = prob.status == pulp.LpStatusOptimal
+        except pulp.PulpSolverError as e:
+            print(f"Solver error in {model}: {e}. Falling back to the heuristic selector")
+            solved = False
+        seconds = time.perf_counter() - start
+        
+        # Hit the limit without proving optimality (with or without an incumbent)
+        timed_out = (self.solver_time_limit is not None and seconds >= self.solver_time_limit
+                     and prob.sol_status != pulp.LpSolutionOptimal)
+        if solver_log is not None:
+            solver_log.append(self.record_solve(model, self.resolve_solver_engine(), seconds, solved, timed_out))
+        return solved
+    
+    def record_solve(self, model: str, engine: str, seconds: float, solved: bool,
+                     timed_out: bool = False) -> Dict:
+        """
+        Solver log entry for one solver call
+        """
+        return {
+            'model': model, 'engine': engine, 'seconds': round(seconds, 4),
+            'solved': solved, 'timed_out': timed_out
+        }
+    
+    def solver_summary(self, solver_log: List[Dict]) -> Dict:
+        """
+        Solver stamp for a plan from its solver log: engines used, solves, time spent in
+        the solver, time-limit hits and solves that fell back to the heuristic selector
+        """
+        engines = sorted({call['engine'] for call in solver_log})
+        return {
+            'engine': ', '.join(engines) if engines else 'selector',
+            'calls': len(solver_log),
+            'seconds': round(sum(call['seconds'] for call in solver_log), 4),
+            'timeouts': sum(call['timed_out'] for call in solver_log),
+            'fallbacks': sum(not call['solved'] for call in solver_log)
+        }
+    
+    def score_meal_candidates(self, meal_type_foods: pd.DataFrame, vikriti: str, age: int, season: str,
+                              meal_type: str, calories_per_meal: float) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """
+        Dosha balancing scores, calorie contributions and taste labels for a meal's candidates
+        """
+        # Score every candidate with a single dot product against the dosha weights,
+        # taken from the cached catalog-wide vector for foods of this catalog
+        score_table, taste_labels = self.get_score_table(meal_type_foods)
+        positions = self.food_df.index.get_indexer(meal_type_foods.index)
+        if (positions >= 0).all():
+            scores = self.meal_score_vector(vikriti, age, season, meal_type)[positions]
+        else:
+            dosha_weights = self.calculate_dosha_weights(vikriti, age, season, meal_type)
+            scores = score_table @ np.array([dosha_weights[dosha] for dosha in self.doshas])
+        
+        # Calorie contribution of each food at its computed portion size
+        food_calories = meal_type_foods['Calories'].to_numpy(dtype=float)
+        portions = self.calculate_portion_sizes(food_calories, calories_per_meal)
+        calorie_contributions = (food_calories / self.standard_portion) * portions
+        
+        return scores, calorie_contributions, taste_labels
+    
+    def in_calorie_window(self, calorie_contributions: np.ndarray, calories_per_meal: float) -> np.ndarray:
+        """
+        Foods whose calories fall within 15% of the meal target
+        """
+        return ((calorie_contributions >= calories_per_meal * 0.85) &
+                (calorie_contributions <= calories_per_meal * 1.15))
+    
+    def top_alternatives(self, scores: np.ndarray, calorie_contributions: np.ndarray,
+                         calories_per_meal: float, k: int) -> List[int]:
+        """
+        Positions of the k best-scoring foods within the calorie window, best first.
+        One partial sort (argpartition-style) instead of k solver runs; ties keep
+        catalog order, matching select_single_food.
+        """
+        candidates = np.flatnonzero(self.in_calorie_window(calorie_contributions, calories_per_meal))
+        if k <= 0 or len(candidates) == 0:
+            return []
+        
+        candidate_scores = scores[candidates]
+        if len(candidates) > k:
+            # Everything strictly above the k-th best score, then ties in catalog order
+            kth_score = np.partition(candidate_scores, len(candidates) - k)[len(candidates) - k]
+            better = candidates[candidate_scores > kth_score]
+            ties = candidates[candidate_scores == kth_score][:k - len(better)]
+            candidates = np.concatenate([better, ties])
+            candidate_scores = scores[candidates]
+        
+        order = np.lexsort((candidates, -candidate_scores))
+        return candidates[order].tolist()
+    
+    def meal_alternatives(self, filtered_foods: pd.DataFrame, vikriti: str, calories_per_meal: float,
+                          season: str, meal_type: str, age: int, k: int) -> List[Dict]:
+        """
+        The k best foods that could replace a meal of meal_type, best first: same meal
+        type and inside the calorie window
+        """
+        meal_type_foods = self.select_meal_type(filtered_foods, meal_type, calories_per_meal=calories_per_meal)
+        if meal_type_foods.empty:
+            return []
+        
+        scores, calorie_contributions, taste_labels = self.score_meal_candidates(
+            meal_type_foods, vikriti, age, season, meal_type, calories_per_meal
+        )
+        return [
+            self.build_food_entry(meal_type_foods.iloc[pos], calories_per_meal, taste_labels[pos])[0]
+            for pos in self.top_alternatives(scores, calorie_contributions, calories_per_meal, k)
+        ]
+    
+    def plan_alternatives(self, selection: Dict[Tuple[str, str], Tuple[List[Dict], float]],
+                          filtered_foods: pd.DataFrame, vikriti: str, calories_per_meal: float,
+                          season: str, age: int, k: int,
+                          no_repeat_days: int = None) -> Dict[Tuple[str, str], List[Dict]]:
+        """
+        Top-k alternatives for every meal of a finished plan. Each meal type is ranked
+        once; a meal then skips foods served up to no_repeat_days days before or after it
+        (anywhere in the plan when None), the window iter_day_selections plans with, so
+        swapping in an alternative never creates a repeat.
+        """
+        days = list(dict.fromkeys(day for day, _ in selection))
+        day_foods = {day: set() for day in days}
+        for (day, _), (foods, _) in selection.items():
+            day_foods[day].update(food['name'] for food in foods)
+        
+        if no_repeat_days:
+            nearby_foods = {
+                day: set().union(*(day_foods[other] for other in
+                                   days[max(0, day_idx - no_repeat_days):day_idx + no_repeat_days + 1]))
+                for day_idx, day in enumerate(days)
+            }
+        else:
+            planned_foods = set().union(*day_foods.values())
+            nearby_foods = dict.fromkeys(days, planned_foods)
+        
+        # Enough ranked foods that every meal still has k left after its exclusions
+        ranked_count = k + max((len(foods) for foods in nearby_foods.values()), default=0)
+        ranked = {}
+        alternatives = {}
+        for day, meal_type in selection:
+            if meal_type not in ranked:
+                ranked[meal_type] = self.meal_alternatives(
+                    filtered_foods, vikriti, self.slot_calories(meal_type, calories_per_meal), season,
+                    meal_type, age, ranked_count
+                )
+            alternatives[(day, meal_type)] = [
+                food for food in ranked[meal_type] if food['name'] not in nearby_foods[day]
+            ][:k]
+        return alternatives
+    
+    def select_single_food(self, scores: np.ndarray, calorie_contributions: np.ndarray,
+                           calories_per_meal: float) -> List[int]:
+        """
+        Closed-form solution of the one-food meal problem: the best-scoring food
+        whose calories fall within 15% of the meal target
+        """
+        feasible = self.in_calorie_window(calorie_contributions, calories_per_meal)
+        
+        if not feasible.any():
+            # Fallback: select the first available food
+            return [0]
+        
+        return [int(np.argmax(np.where(feasible, scores, -np.inf)))]
+    
+    def solve_meal_lp(self, scores: np.ndarray, calorie_contributions: np.ndarray,
+                      calories_per_meal: float, solver_log: List[Dict] = None) -> List[int]:
+        """
+        Use linear programming to select foods for a meal
+        """
+        pulp = _import_pulp()
+        
         # Create the problem
         prob = pulp.LpProblem("AyurvedicMealPlanning", pulp.LpMaximize)
         
         # Decision variables: whether to include each food (binary)
-        food_vars = pulp.LpVariable.dicts("Food", meal_type_foods.index, cat="Binary")
+        food_vars = pulp.LpVariable.dicts("Food", range(len(scores)), cat="Binary")
+        variables = [food_vars[pos] for pos in range(len(scores))]
         
-        # Calculate dosha weights based on multiple factors
-        age_dosha = self.determine_age_dosha(age)
-        seasonal_dosha = self.determine_seasonal_dosha(season)
-        time_dosha = self.determine_time_dosha(meal_type)
+        # Objective function: maximize dosha balancing with penalty for used foods
+        prob += pulp.LpAffineExpression(zip(variables, scores.tolist())), "Total_Dosha_Balancing_Score"
         
-        # Base weights (prioritize balancing vikriti)
-        dosha_weights = {
-            'Vata': 1.0,
-            'Pitta': 1.0,
-            'Kapha': 1.0
-        }
+        # Constraints
+        # 1. Calorie constraint for the meal, allowing 15% flexibility
+        calorie_expr = pulp.LpAffineExpression(zip(variables, calorie_contributions.tolist()))
+        prob += calorie_expr >= calories_per_meal * 0.85, "MinCalories"
+        prob += calorie_expr <= calories_per_meal * 1.15, "MaxCalories"
         
-        # Increase weight for imbalanced doshas (vikriti)
-        if vikriti:
-            for dosha in vikriti.split(','):
-                dosha = dosha.strip()
-                if dosha in dosha_weights:
-                    dosha_weights[dosha] = 2.0  # Higher priority to balance vikriti
+        # 2. Select exactly 1 food per meal
+        prob += pulp.lpSum(variables) == 1, "ExactlyOneFood"
         
-        # Apply age, season, and time influences
-        for dosha in dosha_weights:
-            dosha_weights[dosha] *= age_dosha[dosha] * seasonal_dosha[dosha] * time_dosha[dosha]
+        # Solve the problem
+        if not self.solve_model(prob, "meal_lp", solver_log=solver_log):
+            # Infeasible or timed out: the closed-form selector (the first food if nothing fits)
+            return self.select_single_food(scores, calorie_contributions, calories_per_meal)
         
-        # Objective function: maximize dosha balancing with penalty for used foods
+        return [pos for pos, var in enumerate(variables) if pulp.value(var) == 1]
+    
+    def combination_candidate_positions(self, meal_type_foods: pd.DataFrame, scores: np.ndarray) -> np.ndarray:
+        """
+        Bound the combination MILP: the best-scoring foods plus the densest source of each
+        macro per calorie, so complements that fix protein/fat/carb gaps stay available
+        """
+        n_best = min(self.combination_candidates, len(scores))
+        keep = [np.argsort(-scores, kind='stable')[:n_best]]
+        
+        calories = np.maximum(meal_type_foods['Calories'].to_numpy(dtype=float), 1.0)
+        for column in ['Protein (g)', 'Fats (g)', 'Carbs (g)']:
+            density = meal_type_foods[column].to_numpy(dtype=float) / calories
+            keep.append(np.argsort(-density, kind='stable')[:self.combination_macro_candidates])
+        
+        return np.unique(np.concatenate(keep))
+    
+    def solve_meal_combination(self, meal_type_foods: pd.DataFrame, scores: np.ndarray,
+                               calories_per_meal: float, macro_targets: Dict[str, float],
+                               macro_weight: float = 2.0,
+                               solver_log: List[Dict] = None) -> List[Tuple[int, float]]:
+        """
+        Pick min_meal_items..max_meal_items foods with continuous portions (bounded MILP).
+        Maximizes the calorie-weighted dosha score minus the relative deviation from the
+        meal's macro targets, within the 15% calorie window. The solver is warm-started
+        from the best foods at equal calorie shares. Returns [(position, portion)], or
+        None when the meal has no feasible combination.
+        """
+        pulp = _import_pulp()
+        
+        positions = self.combination_candidate_positions(meal_type_foods, scores)
+        if len(positions) < self.min_meal_items:
+            return None
+        
+        candidates = meal_type_foods.iloc[positions]
+        candidate_scores = scores[positions]
+        kcal_per_gram = candidates['Calories'].to_numpy(dtype=float) / self.standard_portion
+        max_item_portion = float(self.max_portion)
+        
+        prob = pulp.LpProblem("AyurvedicMealCombination", pulp.LpMaximize)
+        chosen = [pulp.LpVariable(f"Chosen_{idx}", cat="Binary") for idx in range(len(positions))]
+        portions = [pulp.LpVariable(f"Portion_{idx}", lowBound=0, upBound=max_item_portion)
+                    for idx in range(len(positions))]
+        
+        for idx, (chosen_var, portion_var) in enumerate(zip(chosen, portions)):
+            prob += portion_var >= self.min_item_portion * chosen_var, f"MinPortion_{idx}"
+            prob += portion_var <= max_item_portion * chosen_var, f"MaxPortion_{idx}"
+        
+        prob += pulp.lpSum(chosen) >= self.min_meal_items, "MinItems"
+        prob += pulp.lpSum(chosen) <= self.max_meal_items, "MaxItems"
+        prob += pulp.lpSum(portions) <= self.max_meal_portion, "MaxMealPortion"
+        
+        # 1 kcal margin so the window still holds once portions are rounded to 0.1 g
+        calorie_expr = pulp.LpAffineExpression(zip(portions, kcal_per_gram.tolist()))
+        prob += calorie_expr >= calories_per_meal * 0.85 + 1, "MinCalories"
+        prob += calorie_expr <= calories_per_meal * 1.15 - 1, "MaxCalories"
+        
+        # Each food contributes its score in proportion to its share of the meal's calories
+        objective = [pulp.LpAffineExpression(zip(
+            portions, (candidate_scores * kcal_per_gram / calories_per_meal).tolist()
+        ))]
+        
+        macro_columns = {'protein': 'Protein (g)', 'fats': 'Fats (g)', 'carbs': 'Carbs (g)'}
+        for macro, target in macro_targets.items():
+            if target <= 0:
+                continue
+            grams_per_gram = candidates[macro_columns[macro]].to_numpy(dtype=float) / self.standard_portion
+            under = pulp.LpVariable(f"{macro}_under", lowBound=0)
+            over = pulp.LpVariable(f"{macro}_over", lowBound=0)
+            prob += (pulp.LpAffineExpression(zip(portions, grams_per_gram.tolist())) + under - over
+                     == target), f"Meal_{macro}"
+            objective.append(-macro_weight / target * (under + over))
+        
+        prob += pulp.lpSum(objective), "Total_Dosha_Balancing_Score"
+        
+        # Warm start: the best foods at equal calorie shares, if that lands in the window
+        start = np.argsort(-candidate_scores, kind='stable')[:self.min_meal_items]
+        start_portions = np.clip(calories_per_meal / len(start) / np.maximum(kcal_per_gram[start], 1e-9),
+                                 self.min_item_portion, max_item_portion)
+        start_calories = float(kcal_per_gram[start] @ start_portions)
+        warm_start = (calories_per_meal * 0.85 + 1 <= start_calories <= calories_per_meal * 1.15 - 1
+                      and start_portions.sum() <= self.max_meal_portion)
+        if warm_start:
+            for idx, portion in zip(start, start_portions):
+                chosen[idx].setInitialValue(1)
+                portions[idx].setInitialValue(float(portion))
+        
+        if not self.solve_model(prob, "meal_combination", warm_start=warm_start, gap=0.01,
+                                solver_log=solver_log):
+            return None
+        
+        selection = [
+            (int(positions[idx]), round(pulp.value(portion_var), 1))
+            for idx, (chosen_var, portion_var) in enumerate(zip(chosen, portions))
+            if round(pulp.value(chosen_var) or 0) == 1
+        ]
+        # Largest portion first, so the main dish leads the meal
+        return sorted(selection, key=lambda item: -item[1])
+    
+    def optimize_week(self, filtered_foods: pd.DataFrame, vikriti: str, calories_per_meal: float,
+                      season: str, age: int, n_days: int, meal_types: List[str],
+                      macro_targets: Dict[str, float], macro_weight: float = 5.0,
+                      solver_log: List[Dict] = None) -> Dict:
+        """
+        Select every meal of the week with a single MILP: one food per (day, meal),
+        no food repeated across the week, per-meal calorie windows and soft weekly
+        macro targets. Returns {(day_idx, meal_type): (selected_foods, meal_calories)},
+        or None when no optimal plan is found.
+        """
+        pulp = _import_pulp()
+        
+        prob = pulp.LpProblem("AyurvedicWeeklyMealPlanning", pulp.LpMaximize)
+        
+        # Scores do not depend on the day, so every day of a meal type is the same
+        # slot. Each variable counts how many days a food is served for a meal type,
+        # which avoids a 7-fold symmetric copy of the same choice per day.
         objective_terms = []
-        for idx, food in meal_type_foods.iterrows():
-            # Calculate taste-based dosha impact
-            tastes = self.estimate_food_tastes(food['Food Name'])
-            taste_impact = self.calculate_taste_impact(tastes)
+        macro_terms = {macro: [] for macro in macro_targets}
+        macro_columns = {'protein': 'Protein (g)', 'fats': 'Fats (g)', 'carbs': 'Carbs (g)'}
+        food_usage = {}
+        usage_limits = {}
+        meal_candidates = {}
+        
+        for meal_type in meal_types:
+            meal_type_foods = self.select_meal_type(filtered_foods, meal_type)
+            if meal_type_foods.empty:
+                continue
             
-            # Combined score (symbolic effect + taste impact)
-            dosha_score = 0
-            for dosha in ['Vata', 'Pitta', 'Kapha']:
-                effect = food[dosha]
-                taste_effect = taste_impact[dosha]
-                
-                # Symbolic effect
-                if effect == '-':  # Food decreases this dosha
-                    symbol_score = dosha_weights[dosha]
-                elif effect == '+':  # Food increases this dosha (bad for imbalance)
-                    symbol_score = -dosha_weights[dosha]
-                else:  # Neutral
-                    symbol_score = 0
-                
-                # Taste effect (positive means we want to reduce this dosha)
-                taste_score = -taste_effect * dosha_weights[dosha]
-                
-                # Combine scores
-                dosha_score += symbol_score + taste_score
+            meal_calories = self.slot_calories(meal_type, calories_per_meal)
+            scores, calorie_contributions, taste_labels = self.score_meal_candidates(
+                meal_type_foods, vikriti, age, season, meal_type, meal_calories
+            )
+            
+            # Per-meal calorie window: only foods that fit it are candidates. If none
+            # fit, fall back to every food of this meal type as optimize_meals does.
+            in_window = self.in_calorie_window(calorie_contributions, meal_calories)
+            if in_window.any():
+                candidate_positions = np.flatnonzero(in_window)
+            else:
+                candidate_positions = np.arange(len(meal_type_foods))
+            
+            candidates = meal_type_foods.iloc[candidate_positions]
+            candidate_scores = scores[candidate_positions]
+            portions = self.calculate_portion_sizes(
+                candidates['Calories'].to_numpy(dtype=float), meal_calories
+            )
             
-            # Apply penalty for foods that have been used in the week
-            penalty = 0
-            if food['Food Name'] in weekly_used_foods:
-                # High penalty for foods already used this week
-                penalty = -10.0  # Very high penalty to prevent selection
+            # Allow repeats only when there are fewer candidates than days
+            repeat_limit = -(-n_days // len(candidates))
+            serving_vars = [
+                pulp.LpVariable(f"Food_{meal_type}_{pos}", lowBound=0, upBound=repeat_limit,
+                                cat="Binary" if repeat_limit == 1 else "Integer")
+                for pos in range(len(candidates))
+            ]
+            prob += pulp.lpSum(serving_vars) == n_days, f"OneFoodPerDay_{meal_type}"
+            objective_terms.append(pulp.LpAffineExpression(zip(serving_vars, candidate_scores.tolist())))
             
-            objective_terms.append(food_vars[idx] * (dosha_score + penalty))
+            for macro in macro_targets:
+                amounts = candidates[macro_columns[macro]].to_numpy(dtype=float) / self.standard_portion * portions
+                macro_terms[macro].append(pulp.LpAffineExpression(zip(serving_vars, amounts.tolist())))
+            for name, var in zip(candidates['Food Name'], serving_vars):
+                food_usage.setdefault(name, []).append(var)
+                usage_limits[name] = max(usage_limits.get(name, 1), repeat_limit)
+            
+            meal_candidates[meal_type] = (
+                candidates, candidate_scores, [taste_labels[pos] for pos in candidate_positions],
+                serving_vars, meal_calories
+            )
         
-        prob += pulp.lpSum(objective_terms), "Total_Dosha_Balancing_Score"
+        if not meal_candidates:
+            return None
         
-        # Constraints
-        # 1. Calorie constraint for the meal
-        calorie_terms = []
-        for idx, food in meal_type_foods.iterrows():
-            portion = self.calculate_portion_size(food['Calories'], calories_per_meal)
-            calorie_contribution = (food['Calories'] / self.standard_portion) * portion
-            calorie_terms.append(food_vars[idx] * calorie_contribution)
+        # No food repeated across meal types
+        for food_idx, (name, usage_vars) in enumerate(food_usage.items()):
+            if len(usage_vars) > 1:
+                prob += pulp.lpSum(usage_vars) <= usage_limits[name], f"NoRepeat_{food_idx}"
         
-        # Allow 15% flexibility in calorie target
-        prob += pulp.lpSum(calorie_terms) >= calories_per_meal * 0.85, "MinCalories"
-        prob += pulp.lpSum(calorie_terms) <= calories_per_meal * 1.15, "MaxCalories"
+        # Soft weekly macro targets: penalize relative deviation in either direction
+        for macro, daily_target in macro_targets.items():
+            weekly_target = daily_target * n_days
+            if weekly_target <= 0:
+                continue
+            under = pulp.LpVariable(f"{macro}_under", lowBound=0)
+            over = pulp.LpVariable(f"{macro}_over", lowBound=0)
+            prob += pulp.lpSum(macro_terms[macro]) + under - over == weekly_target, f"Weekly_{macro}"
+            objective_terms.append(-macro_weight / weekly_target * (under + over))
         
-        # 2. Select exactly 1 food per meal
-        prob += pulp.lpSum(food_vars.values()) == 1, "ExactlyOneFood"
+        prob += pulp.lpSum(objective_terms), "Total_Dosha_Balancing_Score"
         
-        # Solve the problem
-        prob.solve()
+        # Many foods tie on score, so proving exact optimality of the macro terms is
+        # expensive; a 0.5% relative gap is well below any meaningful score difference
+        if not self.solve_model(prob, "week", gap=0.005, solver_log=solver_log):
+            return None
+        
+        # Hand the chosen foods out to the days, best-scoring first
+        week_selection = {}
+        for meal_type, (candidates, candidate_scores, taste_labels, serving_vars,
+                        meal_calories) in meal_candidates.items():
+            servings = np.array([round(pulp.value(var) or 0) for var in serving_vars])
+            order = np.argsort(-candidate_scores, kind='stable')
+            day_positions = np.repeat(order, servings[order])
+            
+            for day_idx, pos in enumerate(day_positions[:n_days]):
+                food_entry, food_calories = self.build_food_entry(
+                    candidates.iloc[pos], meal_calories, taste_labels[pos]
+                )
+                week_selection[(day_idx, meal_type)] = ([food_entry], round(food_calories, 1))
         
-        # Check if solution was found
-        if prob.status != pulp.LpStatusOptimal:
-            # Fallback: select the first available food
-            if not meal_type_foods.empty:
-                food = meal_type_foods.iloc[0]
-                portion = self.calculate_portion_size(food['Calories'], calories_per_meal)
-                food_calories = (food['Calories'] / self.standard_portion) * portion
-                tastes = self.estimate_food_tastes(food['Food Name'])
+        return week_selection
+    
+    def partition_days(self, filtered_foods: pd.DataFrame, vikriti: str, calories_per_meal: float,
+                       season: str, age: int, n_days: int, meal_types: List[str],
+                       seed: int = None) -> List[Dict[str, pd.DataFrame]]:
+        """
+        Split each meal type's candidates across days up front so days can be planned
+        independently. Candidates are ranked (foods inside the calorie window first, then
+        by score) and dealt round-robin: each round gives every meal type of every day its
+        next-ranked food. A food name is dealt once, which rules out repeats across the
+        plan unless a meal type has fewer foods than days. seed shuffles equally ranked
+        foods; without it ties keep catalog order. Returns one {meal_type: candidates} per day.
+        """
+        rng = np.random.default_rng(seed) if seed is not None else None
+        ranked_foods = {}
+        for meal_type in meal_types:
+            meal_type_foods = self.select_meal_type(filtered_foods, meal_type)
+            if meal_type_foods.empty:
+                continue
+            
+            meal_calories = self.slot_calories(meal_type, calories_per_meal)
+            scores, calorie_contributions, _ = self.score_meal_candidates(
+                meal_type_foods, vikriti, age, season, meal_type, meal_calories
+            )
+            in_window = self.in_calorie_window(calorie_contributions, meal_calories)
+            tie_break = rng.permutation(len(scores)) if rng is not None else np.arange(len(scores))
+            ranked = np.lexsort((tie_break, -scores, ~in_window))
+            ranked_foods[meal_type] = (meal_type_foods, ranked, meal_type_foods['Food Name'].to_numpy()[ranked])
+        
+        buckets = {meal_type: [[] for _ in range(n_days)] for meal_type in ranked_foods}
+        next_rank = dict.fromkeys(ranked_foods, 0)
+        dealt_names = set()
+        while any(next_rank[meal_type] < len(ranked) for meal_type, (_, ranked, _) in ranked_foods.items()):
+            for meal_type, (_, ranked, names) in ranked_foods.items():
+                for day_idx in range(n_days):
+                    rank = next_rank[meal_type]
+                    while rank < len(ranked) and names[rank] in dealt_names:
+                        rank += 1
+                    if rank < len(ranked):
+                        buckets[meal_type][day_idx].append(ranked[rank])
+                        dealt_names.add(names[rank])
+                        rank += 1
+                    next_rank[meal_type] = rank
+        
+        day_candidates = [{} for _ in range(n_days)]
+        for meal_type, (meal_type_foods, ranked, _) in ranked_foods.items():
+            for day_idx, positions in enumerate(buckets[meal_type]):
+                # Out of fresh foods: wrap around, as sequential planning reuses foods
+                positions = positions or [ranked[day_idx % len(ranked)]]
+                day_candidates[day_idx][meal_type] = meal_type_foods.iloc[np.sort(positions)]
+        
+        return day_candidates
+    
+    def plan_day(self, day_candidates: Dict[str, pd.DataFrame], vikriti: str, calories_per_meal: float,
+                 season: str, age: int, use_solver: bool = False, combination: bool = False,
+                 macro_targets: Dict[str, float] = None,
+                 solver_log: List[Dict] = None) -> Dict[str, Tuple[List[Dict], float]]:
+        """
+        Optimize every meal of one day from its share of partition_days
+        """
+        return {
+            meal_type: self.optimize_meal_candidates(
+                meal_type_foods, vikriti, self.slot_calories(meal_type, calories_per_meal), season,
+                meal_type, age, set(),
+                use_solver=use_solver, combination=combination,
+                macro_targets=self.slot_macro_targets(meal_type, macro_targets), solver_log=solver_log
+            )
+            for meal_type, meal_type_foods in day_candidates.items()
+        }
+    
+    def plan_days_parallel(self, filtered_foods: pd.DataFrame, vikriti: str, calories_per_meal: float,
+                           season: str, age: int, n_days: int, meal_types: List[str],
+                           use_solver: bool = False, combination: bool = False,
+                           macro_targets: Dict[str, float] = None, seed: int = None,
+                           max_workers: int = None, processes: bool = False,
+                           solver_log: List[Dict] = None) -> Dict:
+        """
+        Plan n_days independently from a partition_days split, in a thread pool or, with
+        processes=True, a process pool; max_workers=1 plans in the calling thread.
+        Results depend only on the inputs and seed, never on scheduling.
+        Solver calls of every day are appended to solver_log when given.
+        Returns {(day_idx, meal_type): (selected_foods, meal_calories)} like optimize_week.
+        """
+        # Scoring the partition also fills the shared score caches before workers start
+        day_candidates = self.partition_days(
+            filtered_foods, vikriti, calories_per_meal, season, age, n_days, meal_types, seed
+        )
+        plan_args = {'vikriti': vikriti, 'calories_per_meal': calories_per_meal, 'season': season,
+                     'age': age, 'use_solver': use_solver, 'combination': combination,
+                     'macro_targets': macro_targets}
+        max_workers = max_workers or os.cpu_count() or 1
+        
+        if max_workers == 1:
+            day_plans = [self.plan_day(candidates, **plan_args, solver_log=solver_log)
+                         for candidates in day_candidates]
+        elif processes:
+            # Days travel as row labels; each worker holds its own copy of the planner
+            day_labels = [
+                {meal_type: foods.index for meal_type, foods in candidates.items()}
+                for candidates in day_candidates
+            ]
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_batch_worker,
+                                     initargs=(self.worker_copy(),)) as executor:
+                results = list(executor.map(_run_plan_day, day_labels, [plan_args] * n_days))
+            day_plans = [day_plan for day_plan, _ in results]
+            if solver_log is not None:
+                for _, day_log in results:
+                    solver_log.extend(day_log)
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                day_plans = list(executor.map(
+                    lambda candidates: self.plan_day(candidates, **plan_args, solver_log=solver_log),
+                    day_candidates
+                ))
+        
+        return {
+            (day_idx, meal_type): day_plan.get(meal_type, ([], 0))
+            for day_idx, day_plan in enumerate(day_plans)
+            for meal_type in meal_types
+        }
+    
+    def build_food_entry(self, food: pd.Series, calories_per_meal: float, tastes: str,
+                         portion: float = None) -> Tuple[Dict, float]:
+        """
+        Describe a selected food at its portion size; returns the entry and its exact calories.
+        The portion defaults to calculate_portion_size for a one-food meal.
+        """
+        if portion is None:
+            portion = self.calculate_portion_size(food['Calories'], calories_per_meal)
+        food_calories = (food['Calories'] / self.standard_portion) * portion
+        
+        food_entry = {
+            'name': food['Food Name'],
+            'portion': portion,
+            'calories': round(food_calories, 1),
+            'protein': round((food['Protein (g)'] / self.standard_portion) * portion, 1),
+            'carbs': round((food['Carbs (g)'] / self.standard_portion) * portion, 1),
+            'fats': round((food['Fats (g)'] / self.standard_portion) * portion, 1),
+            'vata_effect': food['Vata'],
+            'pitta_effect': food['Pitta'],
+            'kapha_effect': food['Kapha'],
+            'tastes': tastes
+        }
+        return food_entry, food_calories
+    
+    def plan_meal_types(self, meal_types: List[str] = None, extras: Iterable[str] = ()) -> List[str]:
+        """
+        Meal slots of each day: meal_types (the main meals by default) followed by
+        optional slots from optional_meal_shares, e.g. extras=('snack', 'dessert')
+        """
+        unknown = [extra for extra in extras if extra not in self.optional_meal_shares]
+        if unknown:
+            raise ValueError(f"Unknown optional meal slots {unknown}; "
+                             f"choose from {list(self.optional_meal_shares)}")
+        meal_types = list(meal_types or self.main_meal_types)
+        return meal_types + [extra for extra in extras if extra not in meal_types]
+    
+    def day_labels(self, n_days: int) -> List[str]:
+        """
+        Weekday names for plans of up to a week, 'Week k <weekday>' for longer horizons
+        """
+        if n_days <= len(self.week_days):
+            return self.week_days[:n_days]
+        return [f"Week {day_idx // len(self.week_days) + 1} {self.week_days[day_idx % len(self.week_days)]}"
+                for day_idx in range(n_days)]
+    
+    def slot_calories(self, meal_type: str, calories_per_meal: float) -> float:
+        """
+        Calorie target of a meal slot: a main meal's target, scaled down for optional slots
+        """
+        return calories_per_meal * self.optional_meal_shares.get(meal_type, 1.0)
+    
+    def slot_macro_targets(self, meal_type: str, macro_targets: Dict[str, float]) -> Dict[str, float]:
+        """
+        Macro targets of a meal slot from a main meal's, scaled like slot_calories
+        """
+        if macro_targets is None:
+            return None
+        share = self.optional_meal_shares.get(meal_type, 1.0)
+        return {macro: target * share for macro, target in macro_targets.items()}
+    
+    def meal_targets(self, weight: float, daily_calories: float, meal_types: List[str],
+                     combination: bool = False) -> Tuple[float, Dict[str, float]]:
+        """
+        A main meal's calorie target and, for combination meals, macro targets. The day
+        is split over the main meals plus the optional slots of meal_types at their
+        optional_meal_shares, so snacks and desserts do not add to the daily target.
+        """
+        shares = len(self.main_meal_types) + sum(
+            self.optional_meal_shares[meal_type] for meal_type in meal_types
+            if meal_type in self.optional_meal_shares
+        )
+        meal_macro_targets = None
+        if combination:
+            meal_macro_targets = {
+                macro: target / shares
+                for macro, target in self.calculate_macro_targets(weight, daily_calories).items()
+            }
+        return daily_calories / shares, meal_macro_targets
+    
+    def iter_day_selections(self, filtered_foods: pd.DataFrame, prakriti: str, vikriti: str,
+                            calories_per_meal: float, season: str, age: int, n_days: int,
+                            meal_types: List[str], no_repeat_days: int = None, use_solver: bool = False,
+                            combination: bool = False, macro_targets: Dict[str, float] = None,
+                            solver_log: List[Dict] = None) -> Iterator[Dict[str, Tuple[List[Dict], float]]]:
+        """
+        Optimize meals day by day, yielding {meal_type: (selected_foods, meal_calories)}
+        per day. Foods are not repeated within the last no_repeat_days days (the whole
+        horizon when None), so memory and solver size stay fixed however long the plan.
+        """
+        # Solver models are built once per meal type and re-solved for each day
+        meal_models = {}
+        
+        # Foods of the last no_repeat_days days, or every food used so far
+        recent_days = deque(maxlen=no_repeat_days) if no_repeat_days else None
+        used_foods = set()
+        
+        for day_idx in range(n_days):
+            if recent_days is not None:
+                used_foods = set().union(*recent_days)
+            day_foods = set()
+            day_selection = {}
+            
+            for meal_type in meal_types:
+                selected_foods, meal_calories = self.optimize_meals(
+                    filtered_foods, prakriti, vikriti, self.slot_calories(meal_type, calories_per_meal),
+                    season, meal_type, age, used_foods, day_idx, use_solver=use_solver, combination=combination,
+                    macro_targets=self.slot_macro_targets(meal_type, macro_targets), meal_models=meal_models,
+                    solver_log=solver_log
+                )
                 
-                selected_foods = [{
-                    'name': food['Food Name'],
-                    'portion': portion,
-                    'calories': round(food_calories, 1),
-                    'protein': round((food['Protein (g)'] / self.standard_portion) * portion, 1),
-                    'carbs': round((food['Carbs (g)'] / self.standard_portion) * portion, 1),
-                    'fats': round((food['Fats (g)'] / self.standard_portion) * portion, 1),
-                    'vata_effect': food['Vata'],
-                    'pitta_effect': food['Pitta'],
-                    'kapha_effect': food['Kapha'],
-                    'tastes': ', '.join(tastes)
-                }]
-                return selected_foods, round(food_calories, 1)
-            else:
-                return [], 0
+                # Add selected foods to the used foods to prevent repetition
+                names = [food['name'] for food in selected_foods]
+                used_foods.update(names)
+                day_foods.update(names)
+                day_selection[meal_type] = (selected_foods, meal_calories)
+            
+            if recent_days is not None:
+                recent_days.append(day_foods)
+            yield day_selection
+    
+    def iter_meal_plan(self, age: int, height: float, weight: float, gender: str,
+                       prakriti: str, vikriti: str, activity_level: str,
+                       season: str, dietary_pref: str, allergies: List[str],
+                       n_days: int = 7, meal_types: List[str] = None, extras: Iterable[str] = (),
+                       no_repeat_days: int = None, use_solver: bool = False,
+                       combination: bool = False) -> Iterator[Tuple[str, Dict]]:
+        """
+        Stream a plan of any length one day at a time, yielding (day label, day plan) with
+        the same day plan layout as generate_weekly_plan's weekly_plan entries. Only the
+        sliding no_repeat_days window of used foods is kept, so 30- or 90-day plans run in
+        constant memory, e.g. iter_meal_plan(**profile, n_days=90, no_repeat_days=5).
+        """
+        self.used_foods = set()
+        allergies = allergies or []
         
-        # Extract the solution
-        selected_foods = []
-        total_calories = 0
+        daily_calories, _ = self.calculate_caloric_needs(age, height, weight, gender, activity_level)
+        filtered_foods = self.get_filtered_foods(dietary_pref, allergies)
+        if filtered_foods.empty:
+            return
         
-        for idx, food in meal_type_foods.iterrows():
-            if pulp.value(food_vars[idx]) == 1:
-                portion = self.calculate_portion_size(food['Calories'], calories_per_meal)
-                food_calories = (food['Calories'] / self.standard_portion) * portion
-                total_calories += food_calories
-                
-                # Estimate tastes for this food
-                tastes = self.estimate_food_tastes(food['Food Name'])
-                
-                selected_foods.append({
-                    'name': food['Food Name'],
-                    'portion': portion,
-                    'calories': round(food_calories, 1),
-                    'protein': round((food['Protein (g)'] / self.standard_portion) * portion, 1),
-                    'carbs': round((food['Carbs (g)'] / self.standard_portion) * portion, 1),
-                    'fats': round((food['Fats (g)'] / self.standard_portion) * portion, 1),
-                    'vata_effect': food['Vata'],
-                    'pitta_effect': food['Pitta'],
-                    'kapha_effect': food['Kapha'],
-                    'tastes': ', '.join(tastes)
-                })
+        meal_types = self.plan_meal_types(meal_types, extras)
+        calories_per_meal, meal_macro_targets = self.meal_targets(weight, daily_calories, meal_types, combination)
         
-        return selected_foods, round(total_calories, 1)
+        day_selections = self.iter_day_selections(
+            filtered_foods, prakriti, vikriti, calories_per_meal, season, age, n_days, meal_types,
+            no_repeat_days=no_repeat_days, use_solver=use_solver, combination=combination,
+            macro_targets=meal_macro_targets
+        )
+        for day, day_selection in zip(self.day_labels(n_days), day_selections):
+            yield day, self.assemble_day(day_selection, meal_types, allergies)
     
     def generate_weekly_plan(self, age: int, height: float, weight: float, gender: str,
                             prakriti: str, vikriti: str, activity_level: str, 
-                            season: str, dietary_pref: str, allergies: List[str]) -> Dict:
+                            season: str, dietary_pref: str, allergies: List[str],
+                            use_solver: bool = False, mode: str = "sequential",
+                            filtered_foods: pd.DataFrame = None, alternatives: int = 0,
+                            combination: bool = False, seed: int = None, max_workers: int = None,
+                            n_days: int = 7, meal_types: List[str] = None, extras: Iterable[str] = (),
+                            no_repeat_days: int = None) -> Dict:
         """
-        Generate a weekly meal plan based on user parameters
+        Generate a weekly meal plan based on user parameters.
+        mode="sequential" optimizes one meal at a time in day order; mode="global"
+        plans the whole week as a single problem with optimize_week; mode="parallel"
+        splits the candidates across days up front (see partition_days, seeded by seed)
+        and plans the days concurrently on max_workers threads. A precomputed
+        filter_foods result may be passed as filtered_foods. With alternatives=k every
+        meal also lists its k best replacement foods. combination=True builds each meal
+        from several foods with optimized portions, planning meal by meal.
+        The horizon is n_days days of meal_types plus optional extras ('snack',
+        'dessert'); sequential plans repeat no food within no_repeat_days days (the
+        whole plan when None). See iter_meal_plan to stream long plans day by day.
         """
-        # Reset used foods
+        # Reset used foods; solver calls are logged per plan
         self.used_foods = set()
+        solver_log = []
+        allergies = allergies or []
         
         # Calculate nutritional needs
-        daily_calories, calories_per_meal = self.calculate_caloric_needs(
-            age, height, weight, gender, activity_level
-        )
+        daily_calories, _ = self.calculate_caloric_needs(age, height, weight, gender, activity_level)
         
         # Filter foods based on preferences and allergies
-        filtered_foods = self.filter_foods(dietary_pref, allergies)
+        if filtered_foods is None:
+            filtered_foods = self.get_filtered_foods(dietary_pref, allergies)
         
         if filtered_foods.empty:
             return {"error": "No foods available after applying filters"}
         
-        # Generate meal plan for each day of the week
-        weekly_plan = {}
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        meal_types = ['breakfast', 'lunch', 'dinner']
+        # Generate meal plan for each day of the horizon
+        days = self.day_labels(n_days)
+        meal_types = self.plan_meal_types(meal_types, extras)
         
-        # Track all used foods across the week to ensure no repetition
-        weekly_used_foods = set()
+        # Main meal share of the daily calories and, for combination meals, macro targets
+        calories_per_meal, meal_macro_targets = self.meal_targets(weight, daily_calories, meal_types, combination)
         
-        # Track allergy warnings for the entire week
-        weekly_allergy_warnings = {}
+        # Whole-week plan, falling back to sequential optimization if it has no solution
+        week_selection = None
+        if mode == "global" and not combination:
+            week_selection = self.optimize_week(
+                filtered_foods, vikriti, calories_per_meal, season, age, len(days), meal_types,
+                self.calculate_macro_targets(weight, daily_calories), solver_log=solver_log
+            )
+        elif mode == "parallel":
+            week_selection = self.plan_days_parallel(
+                filtered_foods, vikriti, calories_per_meal, season, age, len(days), meal_types,
+                use_solver=use_solver, combination=combination, macro_targets=meal_macro_targets,
+                seed=seed, max_workers=max_workers, solver_log=solver_log
+            )
+        
+        if week_selection is not None:
+            selection = {
+                (day, meal_type): week_selection.get((day_idx, meal_type), ([], 0))
+                for day_idx, day in enumerate(days) for meal_type in meal_types
+            }
+        else:
+            day_selections = self.iter_day_selections(
+                filtered_foods, prakriti, vikriti, calories_per_meal, season, age, len(days), meal_types,
+                no_repeat_days=no_repeat_days, use_solver=use_solver, combination=combination,
+                macro_targets=meal_macro_targets, solver_log=solver_log
+            )
+            selection = {
+                (day, meal_type): meal
+                for day, day_selection in zip(days, day_selections)
+                for meal_type, meal in day_selection.items()
+            }
+        
+        meal_alternatives = None
+        if alternatives:
+            meal_alternatives = self.plan_alternatives(
+                selection, filtered_foods, vikriti, calories_per_meal, season, age, alternatives,
+                no_repeat_days
+            )
         
-        for day_idx, day in enumerate(days):
-            daily_meals = {}
-            total_daily_calories = 0
-            daily_allergy_warnings = []
+        nutrition_summary = self.build_nutrition_summary(
+            daily_calories, calories_per_meal, prakriti, vikriti, dietary_pref, allergies, age, season
+        )
+        return self.assemble_weekly_plan(selection, days, meal_types, allergies, nutrition_summary,
+                                         meal_alternatives, solver_log)
+    
+    def build_nutrition_summary(self, daily_calories: float, calories_per_meal: float, prakriti: str,
+                                vikriti: str, dietary_pref: str, allergies: List[str],
+                                age: int, season: str) -> Dict:
+        """
+        Targets and profile details reported alongside a weekly plan
+        """
+        return {
+            'daily_calorie_target': round(daily_calories, 1),
+            'calories_per_meal_target': round(calories_per_meal, 1),
+            'prakriti': prakriti,
+            'vikriti': vikriti,
+            'dietary_preference': dietary_pref,
+            'allergies': allergies,
+            'age_dosha_impact': self.determine_age_dosha(age),
+            'seasonal_dosha_impact': self.determine_seasonal_dosha(season)
+        }
+    
+    def assemble_day(self, day_selection: Dict[str, Tuple[List[Dict], float]], meal_types: List[str],
+                     allergies: List[str], day_alternatives: Dict[str, List[Dict]] = None) -> Dict:
+        """
+        One day of a plan from {meal_type: (foods, calories)}: its meals, total calories
+        and allergy warnings, plus each meal's alternatives if given
+        """
+        daily_meals = {}
+        total_daily_calories = 0
+        daily_allergy_warnings = []
+        
+        for meal_type in meal_types:
+            selected_foods, meal_calories = day_selection[meal_type]
             
-            for meal_type in meal_types:
-                selected_foods, meal_calories = self.optimize_meals(
-                    filtered_foods, prakriti, vikriti, calories_per_meal, season, meal_type, age, 
-                    weekly_used_foods, day_idx
-                )
-                
-                # Add selected food to weekly used foods to prevent repetition
-                if selected_foods:
-                    weekly_used_foods.add(selected_foods[0]['name'])
-                    
-                    # Generate allergy warnings for this food
-                    if allergies:
-                        warnings = self.generate_allergy_warnings(selected_foods[0]['name'], allergies)
-                        if warnings:
-                            daily_allergy_warnings.extend(warnings)
-                
-                daily_meals[meal_type] = {
-                    'foods': selected_foods,
-                    'total_calories': meal_calories
-                }
-                total_daily_calories += meal_calories
+            # Generate allergy warnings for each food of the meal
+            if allergies:
+                for food in selected_foods:
+                    warnings = self.generate_allergy_warnings(food['name'], allergies)
+                    if warnings:
+                        daily_allergy_warnings.extend(warnings)
             
-            weekly_plan[day] = {
-                'meals': daily_meals,
-                'total_calories': round(total_daily_calories, 1),
-                'allergy_warnings': daily_allergy_warnings
+            daily_meals[meal_type] = {
+                'foods': selected_foods,
+                'total_calories': meal_calories
             }
+            if day_alternatives is not None:
+                daily_meals[meal_type]['alternatives'] = day_alternatives[meal_type]
+            total_daily_calories += meal_calories
+        
+        return {
+            'meals': daily_meals,
+            'total_calories': round(total_daily_calories, 1),
+            'allergy_warnings': daily_allergy_warnings
+        }
+    
+    def assemble_weekly_plan(self, selection: Dict[Tuple[str, str], Tuple[List[Dict], float]],
+                             days: List[str], meal_types: List[str], allergies: List[str],
+                             nutrition_summary: Dict,
+                             meal_alternatives: Dict[Tuple[str, str], List[Dict]] = None,
+                             solver_log: List[Dict] = None) -> Dict:
+        """
+        Build the generate_weekly_plan result from {(day, meal_type): (foods, calories)},
+        adding daily totals, allergy warnings, the solver stamp of solver_log and, if
+        given, each meal's alternatives
+        """
+        weekly_plan = {}
+        
+        # Track allergy warnings for the entire week
+        weekly_allergy_warnings = {}
+        
+        for day in days:
+            day_alternatives = None
+            if meal_alternatives is not None:
+                day_alternatives = {meal_type: meal_alternatives[(day, meal_type)] for meal_type in meal_types}
+            weekly_plan[day] = self.assemble_day(
+                {meal_type: selection[(day, meal_type)] for meal_type in meal_types},
+                meal_types, allergies, day_alternatives
+            )
             
             # Store warnings for the day
-            if daily_allergy_warnings:
-                weekly_allergy_warnings[day] = daily_allergy_warnings
+            if weekly_plan[day]['allergy_warnings']:
+                weekly_allergy_warnings[day] = weekly_plan[day]['allergy_warnings']
         
         # Add summary information
-        result = {
+        return {
             'weekly_plan': weekly_plan,
             'weekly_allergy_warnings': weekly_allergy_warnings,
-            'nutrition_summary': {
-                'daily_calorie_target': round(daily_calories, 1),
-                'calories_per_meal_target': round(calories_per_meal, 1),
-                'prakriti': prakriti,
-                'vikriti': vikriti,
-                'dietary_preference': dietary_pref,
-                'allergies': allergies,
-                'age_dosha_impact': self.determine_age_dosha(age),
-                'seasonal_dosha_impact': self.determine_seasonal_dosha(season)
-            }
+            'nutrition_summary': nutrition_summary,
+            'solver': self.solver_summary(solver_log or [])
+        }
+    
+    def replan_weekly_plan(self, previous_plan: Dict, profile: Dict, changes: Dict = None,
+                           replace_meals: Iterable[Tuple[str, str]] = (),
+                           exclude_foods: Iterable[str] = ()) -> Dict:
+        """
+        Update a generate_weekly_plan result after a small change, recomputing only the
+        affected meals. profile holds the generate_weekly_plan arguments previous_plan was
+        built with and changes the fields to update (e.g. {'allergies': [...]}).
+        replace_meals lists (day, meal_type) slots to re-pick, e.g. ('Tuesday', 'dinner'),
+        and exclude_foods names foods the patient does not want anywhere in the week.
+        
+        Only meals that are replaced, excluded or no longer pass the diet/allergy filter
+        are re-optimized; the other meals are kept. Changes to calorie targets, dosha
+        weights or the horizon (see replan_all_fields) affect every meal and replan the
+        whole plan.
+        The filtered catalog and score vectors come from the planner's caches.
+        """
+        changes = changes or {}
+        new_profile = {**profile, **changes}
+        new_profile['allergies'] = new_profile.get('allergies') or []
+        solver_log = []
+        filtered_foods = self.get_filtered_foods(new_profile['dietary_pref'], new_profile['allergies'])
+        
+        if ('weekly_plan' not in previous_plan or filtered_foods.empty or
+                any(profile.get(field) != new_profile.get(field) for field in self.replan_all_fields)):
+            return self.generate_weekly_plan(**new_profile, filtered_foods=filtered_foods)
+        
+        daily_calories, _ = self.calculate_caloric_needs(
+            new_profile['age'], new_profile['height'], new_profile['weight'],
+            new_profile['gender'], new_profile['activity_level']
+        )
+        
+        days = list(previous_plan['weekly_plan'])
+        meal_types = list(previous_plan['weekly_plan'][days[0]]['meals'])
+        calories_per_meal, meal_macro_targets = self.meal_targets(
+            new_profile['weight'], daily_calories, meal_types, new_profile.get('combination', False)
+        )
+        selection = {
+            (day, meal_type): (meal['foods'], meal['total_calories'])
+            for day, day_plan in previous_plan['weekly_plan'].items()
+            for meal_type, meal in day_plan['meals'].items()
         }
         
-        return result
+        # Replaced foods are rejected too, so the slot does not get the same food back
+        replace_meals = set(replace_meals)
+        rejected = set(exclude_foods)
+        for slot in replace_meals:
+            rejected.update(food['name'] for food in selection[slot][0])
+        
+        allowed = set(filtered_foods['Food Name'])
+        affected = [
+            slot for slot, (foods, _) in selection.items()
+            if slot in replace_meals or any(food['name'] not in allowed or food['name'] in rejected
+                                            for food in foods)
+        ]
+        
+        candidates = filtered_foods
+        if rejected:
+            candidates = filtered_foods[~filtered_foods['Food Name'].isin(rejected)]
+        
+        meal_models = {}
+        for day, meal_type in affected:
+            weekly_used_foods = {
+                food['name'] for slot, (foods, _) in selection.items() if slot != (day, meal_type)
+                for food in foods
+            }
+            selection[(day, meal_type)] = self.optimize_meals(
+                candidates, new_profile['prakriti'], new_profile['vikriti'],
+                self.slot_calories(meal_type, calories_per_meal),
+                new_profile['season'], meal_type, new_profile['age'], weekly_used_foods,
+                days.index(day), use_solver=new_profile.get('use_solver', False),
+                combination=new_profile.get('combination', False),
+                macro_targets=self.slot_macro_targets(meal_type, meal_macro_targets),
+                meal_models=meal_models, solver_log=solver_log
+            )
+        
+        meal_alternatives = None
+        if new_profile.get('alternatives'):
+            meal_alternatives = self.plan_alternatives(
+                selection, candidates, new_profile['vikriti'], calories_per_meal,
+                new_profile['season'], new_profile['age'], new_profile['alternatives'],
+                new_profile.get('no_repeat_days')
+            )
+        
+        nutrition_summary = self.build_nutrition_summary(
+            daily_calories, calories_per_meal, new_profile['prakriti'], new_profile['vikriti'],
+            new_profile['dietary_pref'], new_profile['allergies'], new_profile['age'], new_profile['season']
+        )
+        return self.assemble_weekly_plan(selection, days, meal_types, new_profile['allergies'],
+                                         nutrition_summary, meal_alternatives, solver_log)
+    
+    def generate_rotation_plan(self, profile: Dict, weeks: int = 4, seed: int = None,
+                               max_workers: int = None, processes: bool = False) -> Dict:
+        """
+        Plan a multi-week rotation (e.g. 4 weeks) in one parallel pass. profile holds the
+        generate_weekly_plan arguments (use_solver, combination and alternatives included).
+        Candidates are split across all weeks * 7 days with partition_days, so no food
+        repeats within the rotation while the catalog allows it, and the days are
+        planned concurrently (see plan_days_parallel). The same seed always gives the
+        same rotation. Returns {'weeks': [weekly plan, ...], 'rotation': {...}}.
+        """
+        self.used_foods = set()
+        solver_log = []
+        profile = {**profile, 'allergies': profile.get('allergies') or []}
+        
+        daily_calories, _ = self.calculate_caloric_needs(
+            profile['age'], profile['height'], profile['weight'], profile['gender'], profile['activity_level']
+        )
+        filtered_foods = self.get_filtered_foods(profile['dietary_pref'], profile['allergies'])
+        if filtered_foods.empty:
+            return {"error": "No foods available after applying filters"}
+        
+        days = self.week_days
+        meal_types = self.plan_meal_types(profile.get('meal_types'), profile.get('extras', ()))
+        calories_per_meal, meal_macro_targets = self.meal_targets(
+            profile['weight'], daily_calories, meal_types, profile.get('combination', False)
+        )
+        
+        selection = self.plan_days_parallel(
+            filtered_foods, profile['vikriti'], calories_per_meal, profile['season'], profile['age'],
+            weeks * len(days), meal_types, use_solver=profile.get('use_solver', False),
+            combination=profile.get('combination', False), macro_targets=meal_macro_targets,
+            seed=seed, max_workers=max_workers, processes=processes, solver_log=solver_log
+        )
+        meal_alternatives = None
+        if profile.get('alternatives'):
+            # Alternatives exclude foods anywhere in the rotation, not only the same week
+            meal_alternatives = self.plan_alternatives(
+                selection, filtered_foods, profile['vikriti'], calories_per_meal,
+                profile['season'], profile['age'], profile['alternatives']
+            )
+        
+        nutrition_summary = self.build_nutrition_summary(
+            daily_calories, calories_per_meal, profile['prakriti'], profile['vikriti'],
+            profile['dietary_pref'], profile['allergies'], profile['age'], profile['season']
+        )
+        weekly_plans = []
+        for week in range(weeks):
+            week_days = range(week * len(days), (week + 1) * len(days))
+            week_selection = {
+                (day, meal_type): selection[(day_idx, meal_type)]
+                for day, day_idx in zip(days, week_days) for meal_type in meal_types
+            }
+            week_alternatives = None
+            if meal_alternatives is not None:
+                week_alternatives = {
+                    (day, meal_type): meal_alternatives[(day_idx, meal_type)]
+                    for day, day_idx in zip(days, week_days) for meal_type in meal_types
+                }
+            weekly_plans.append(self.assemble_weekly_plan(
+                week_selection, days, meal_types, profile['allergies'], nutrition_summary, week_alternatives,
+                solver_log
+            ))
+        
+        served = [food['name'] for foods, _ in selection.values() for food in foods]
+        return {
+            'weeks': weekly_plans,
+            'rotation': {
+                'weeks': weeks,
+                'seed': seed,
+                'distinct_foods': len(set(served)),
+                'repeated_servings': len(served) - len(set(served))
+            },
+            'solver': self.solver_summary(solver_log)
+        }
+    
+    def generate_weekly_plans(self, profiles: Iterable[Dict], max_workers: int = None,
+                              **plan_options) -> Iterator[Dict]:
+        """
+        Generate weekly plans for many patients, yielding them in input order.
+        Patients sharing (dietary_pref, allergies) share one filter_foods result;
+        plans are optimized in a process pool with a bounded number in flight.
+        max_workers=1 plans in the current process.
+        """
+        # Build the shared score table before the planner is sent to workers
+        self.get_score_table(self.food_df.iloc[:0])
+        group_foods = {}
+        
+        def plan_tasks():
+            for profile in profiles:
+                # Normalized like generate_weekly_plan does, for the group key
+                profile = {**profile, 'allergies': profile.get('allergies') or []}
+                group_key = (profile['dietary_pref'].lower(),
+                             tuple(sorted(allergy.lower() for allergy in profile['allergies'])))
+                if group_key not in group_foods:
+                    group_foods[group_key] = self.filter_foods(profile['dietary_pref'], profile['allergies'])
+                yield group_key, profile
+        
+        if max_workers == 1:
+            for group_key, profile in plan_tasks():
+                yield self.generate_weekly_plan(**profile, filtered_foods=group_foods[group_key], **plan_options)
+            return
+        
+        max_workers = max_workers or os.cpu_count() or 1
+        max_in_flight = max_workers * 4
+        
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_batch_worker,
+                                 initargs=(self.worker_copy(),)) as executor:
+            pending = deque()
+            
+            for group_key, profile in plan_tasks():
+                pending.append(executor.submit(
+                    _run_batch_plan, group_key, group_foods[group_key].index, profile, plan_options
+                ))
+                if len(pending) >= max_in_flight:
+                    yield pending.popleft().result()
+            
+            while pending:
+                yield pending.popleft().result()
+    
+    def worker_copy(self) -> "AdvancedAyurvedicMealPlanner":
+        """
+        Copy of the planner for worker processes, without the (unpicklable, unused)
+        allergy classifier
+        """
+        worker_planner = copy.copy(self)
+        worker_planner.allergy_classifier = None
+        worker_planner.classifier_pending = False
+        return worker_planner
     
     def export_to_csv(self, meal_plan: Dict, filename: str = "ayurvedic_meal_plan.csv"):
         """
-        Export the meal plan to a CSV file
+        Export the meal plan to a CSV file, with ayurvedic_meal_plan_summary.csv beside it
         """
         if 'error' in meal_plan:
             print(f"Cannot export: {meal_plan['error']}")
@@ -638,8 +2191,10 @@ class AdvancedAyurvedicMealPlanner:
         df.to_csv(filename, index=False)
         print(f"Meal plan exported to {filename}")
         
-        # Also export a summary CSV
-        self.export_summary_csv(meal_plan, "ayurvedic_meal_plan_summary.csv")
+        # Also export a summary CSV next to the plan
+        self.export_summary_csv(
+            meal_plan, os.path.join(os.path.dirname(filename), "ayurvedic_meal_plan_summary.csv")
+        )
         
         return True
     
@@ -667,15 +2222,19 @@ class AdvancedAyurvedicMealPlanner:
         
         # Add daily totals
         summary_rows.append(['Daily Nutrition Summary', ''])
-        summary_rows.append(['Day', 'Total Calories', 'Breakfast Calories', 'Lunch Calories', 'Dinner Calories'])
+        # One column per meal slot of the plan, extras included
+        meal_types = list(dict.fromkeys(
+            meal_type for day_plan in meal_plan['weekly_plan'].values() for meal_type in day_plan['meals']
+        ))
+        summary_rows.append(['Day', 'Total Calories'] +
+                            [f"{meal_type.capitalize()} Calories" for meal_type in meal_types])
         
         for day, day_plan in meal_plan['weekly_plan'].items():
-            breakfast_cals = day_plan['meals']['breakfast']['total_calories']
-            lunch_cals = day_plan['meals']['lunch']['total_calories']
-            dinner_cals = day_plan['meals']['dinner']['total_calories']
+            meal_cals = [day_plan['meals'][meal_type]['total_calories'] if meal_type in day_plan['meals'] else ''
+                         for meal_type in meal_types]
             total_cals = day_plan['total_calories']
             
-            summary_rows.append([day, total_cals, breakfast_cals, lunch_cals, dinner_cals])
+            summary_rows.append([day, total_cals] + meal_cals)
         
         # Add allergy warnings section
         summary_rows.append(['', ''])
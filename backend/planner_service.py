@@ -0,0 +1,231 @@
+import argparse
+import json
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+import numpy as np
+
+from dosha_model import MODEL_DIR, load_dosha_model, predict_dosha, predict_doshas
+from new_new_new_new_new import AdvancedAyurvedicMealPlanner
+
+# generate_weekly_plan arguments a client may set: the profile (all required) and plan options
+PROFILE_FIELDS = ('age', 'height', 'weight', 'gender', 'prakriti', 'vikriti', 'activity_level',
+                  'season', 'dietary_pref', 'allergies')
+PLAN_OPTIONS = ('use_solver', 'mode', 'seed', 'combination', 'alternatives',
+                'n_days', 'meal_types', 'extras', 'no_repeat_days')
+
+
+class LatencyTracker:
+    """
+    Per-endpoint request latencies, separating the first (cold) request from warm ones
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def record(self, endpoint: str, seconds: float):
+        with self.lock:
+            entry = self.stats.setdefault(endpoint, {'count': 0, 'cold_ms': None, 'warm_total_ms': 0.0})
+            if entry['cold_ms'] is None:
+                entry['cold_ms'] = round(seconds * 1000, 2)
+            else:
+                entry['warm_total_ms'] += seconds * 1000
+            entry['count'] += 1
+
+    def summary(self) -> Dict:
+        with self.lock:
+            return {
+                endpoint: {
+                    'count': entry['count'],
+                    'cold_ms': entry['cold_ms'],
+                    'warm_mean_ms': (round(entry['warm_total_ms'] / (entry['count'] - 1), 2)
+                                     if entry['count'] > 1 else None)
+                }
+                for endpoint, entry in self.stats.items()
+            }
+
+
+def validate_profile(profile: Dict, partial: bool = False) -> Dict:
+    """
+    Check a plan request against PROFILE_FIELDS and PLAN_OPTIONS; raises ValueError naming
+    unexpected fields, or missing profile fields unless partial (e.g. replan changes)
+    """
+    if not isinstance(profile, dict):
+        raise ValueError("expected a JSON object of profile fields")
+    unexpected = sorted(set(profile) - set(PROFILE_FIELDS) - set(PLAN_OPTIONS))
+    if unexpected:
+        raise ValueError(f"unexpected fields {unexpected}")
+    missing = [field for field in PROFILE_FIELDS if field not in profile]
+    if missing and not partial:
+        raise ValueError(f"missing fields {missing}")
+    return profile
+
+
+class PlannerService:
+    """
+    Long-lived planner state: the food catalog, score tables and dosha model are loaded once
+    """
+    def __init__(self, food_data_path: str, model_dir: str = MODEL_DIR, solver_options: Dict = None):
+        start = time.perf_counter()
+        self.planner = AdvancedAyurvedicMealPlanner(food_data_path)
+        self.planner.configure_solver(**(solver_options or {}))
+        # Build the shared score table up front rather than on the first request
+        self.planner.get_score_table(self.planner.food_df.iloc[:0])
+        self.planner_load_seconds = time.perf_counter() - start
+        # Plans keep per-request state on the planner, so requests use it one at a time
+        self.planner_lock = threading.Lock()
+
+        start = time.perf_counter()
+        try:
+            self.dosha_model = load_dosha_model(model_dir)
+            self.dosha_model_error = None
+        except Exception as e:
+            print(f"Error loading dosha model: {e}")
+            self.dosha_model = None
+            self.dosha_model_error = str(e)
+        self.model_load_seconds = time.perf_counter() - start
+
+        self.latency = LatencyTracker()
+
+    def health(self) -> Dict:
+        # Bundled models carry a manifest; legacy pickled ones do not
+        manifest = getattr(self.dosha_model, 'manifest', None)
+        return {
+            'status': 'ok',
+            'foods': len(self.planner.food_df),
+            'dosha_model_loaded': self.dosha_model is not None,
+            'dosha_model_error': self.dosha_model_error,
+            'dosha_model_id': manifest['model_id'] if manifest else None,
+            'startup_ms': {
+                'planner': round(self.planner_load_seconds * 1000, 2),
+                'dosha_model': round(self.model_load_seconds * 1000, 2)
+            },
+            'latency': self.latency.summary()
+        }
+
+    def predict_dosha(self, payload: Dict) -> Dict:
+        if self.dosha_model is None:
+            raise RuntimeError("Dosha model is not loaded")
+        if 'patients' in payload:
+            return {'doshas': predict_doshas(self.dosha_model, payload['patients'])}
+        dosha = predict_dosha(
+            self.dosha_model, payload['age'], payload['weight'], payload['height'],
+            payload['sleep'], payload['digestion'], payload['body_type']
+        )
+        return {'dosha': dosha}
+
+    def weekly_plan(self, payload: Dict) -> Dict:
+        profile = validate_profile(payload)
+        with self.planner_lock:
+            return self.planner.generate_weekly_plan(**profile)
+
+    def replan(self, payload: Dict) -> Dict:
+        # A replan may fall back to a full generate_weekly_plan with profile and changes
+        profile = validate_profile(payload['profile'])
+        changes = validate_profile(payload.get('changes') or {}, partial=True)
+        replace_meals = [tuple(slot) for slot in payload.get('replace_meals', [])]
+        with self.planner_lock:
+            return self.planner.replan_weekly_plan(
+                payload['plan'], profile, changes,
+                replace_meals=replace_meals, exclude_foods=payload.get('exclude_foods', [])
+            )
+
+    def rotation(self, payload: Dict) -> Dict:
+        with self.planner_lock:
+            return self.planner.generate_rotation_plan(
+                payload['profile'], weeks=payload.get('weeks', 4), seed=payload.get('seed')
+            )
+
+
+def to_json(value) -> bytes:
+    """
+    Serialize a response, converting NumPy scalars from the food catalog
+    """
+    def convert(obj):
+        if isinstance(obj, np.generic):
+            return obj.item()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    return json.dumps(value, default=convert).encode("utf-8")
+
+
+class PlannerRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON endpoints: GET /health, POST /predict-dosha, POST /weekly-plan, POST /replan
+    """
+    service = None
+
+    def send_json(self, status: int, body: Dict):
+        data = to_json(body)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, self.service.health())
+        else:
+            self.send_json(404, {'error': f"Unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        routes = {
+            '/predict-dosha': self.service.predict_dosha,
+            '/weekly-plan': self.service.weekly_plan,
+            '/replan': self.service.replan,
+            '/rotation': self.service.rotation
+        }
+        if self.path not in routes:
+            self.send_json(404, {'error': f"Unknown endpoint {self.path}"})
+            return
+
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            result = routes[self.path](payload)
+            status = 200
+        except (KeyError, TypeError, ValueError) as e:
+            result, status = {'error': f"Invalid request: {e}"}, 400
+        except RuntimeError as e:
+            result, status = {'error': str(e)}, 503
+        except Exception as e:
+            traceback.print_exc()
+            result, status = {'error': f"Internal error: {type(e).__name__}: {e}"}, 500
+        self.service.latency.record(self.path, time.perf_counter() - start)
+        self.send_json(status, result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ayurvedic planning service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--foods", default="newnew_foods.csv", help="Food catalog CSV")
+    parser.add_argument("--model-dir", default=MODEL_DIR,
+                        help="Directory with the dosha model bundle (or legacy pickles)")
+    parser.add_argument("--solver", default="auto", help="MILP engine: auto, cbc, highs or glpk")
+    parser.add_argument("--solver-time-limit", type=float, default=10.0,
+                        help="Seconds per solve before falling back to the heuristic selector")
+    parser.add_argument("--solver-threads", type=int, default=None)
+    parser.add_argument("--solver-gap", type=float, default=None, help="Relative MIP gap")
+    args = parser.parse_args()
+
+    solver_options = {'engine': args.solver, 'time_limit': args.solver_time_limit,
+                      'threads': args.solver_threads, 'gap': args.solver_gap}
+    PlannerRequestHandler.service = PlannerService(args.foods, args.model_dir, solver_options)
+    server = ThreadingHTTPServer((args.host, args.port), PlannerRequestHandler)
+    print(f"Planner service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
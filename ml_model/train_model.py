@@ -1,35 +1,337 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Tuple
+
+import numpy as np
 import pandas as pd
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.preprocessing import LabelEncoder
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+from joblib import Parallel, delayed
 import joblib
+import sklearn
+
+ML_MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ML_MODEL_DIR, "..", "backend"))
+
+from dosha_model import BUNDLE_DIR, CATEGORICAL_ENCODERS, FEATURES, load_bundle, write_bundle
+
+NUMERIC_FEATURES = [feature for feature in FEATURES if feature not in CATEGORICAL_ENCODERS]
+TARGET = "dosha"
+
+# Hyperparameters searched with cross-validation; the first best-scoring entry wins
+PARAM_GRID = {
+    'criterion': ['gini', 'entropy'],
+    'max_depth': [4, 8, 16, None],
+    'min_samples_leaf': [1, 5, 20],
+}
+
+# Bump whenever the layout of the encoded-feature cache changes
+FEATURE_CACHE_VERSION = 1
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_vocabularies(path: str, chunksize: int) -> Dict[str, List[str]]:
+    """
+    Sorted distinct labels of every categorical column and the target, read in chunks
+    """
+    columns = list(CATEGORICAL_ENCODERS) + [TARGET]
+    labels = {column: set() for column in columns}
+    for chunk in pd.read_csv(path, usecols=columns, dtype=str, chunksize=chunksize):
+        for column in columns:
+            labels[column].update(chunk[column].dropna().unique())
+    return {column: sorted(values) for column, values in labels.items()}
+
+
+def encode_dataset(path: str, chunksize: int) -> Tuple[np.ndarray, np.ndarray, Dict[str, List[str]]]:
+    """
+    Read the dataset in chunks into a float32 feature matrix (categories as label codes,
+    in the LabelEncoder's sorted order) and int8 target codes, without holding the raw frame
+    """
+    vocabularies = read_vocabularies(path, chunksize)
+    # Fixed dtypes: numerics as float32 (what the tree compares), categories against a known vocabulary
+    dtypes = {column: np.float32 for column in NUMERIC_FEATURES}
+    dtypes.update({column: pd.CategoricalDtype(vocabularies[column]) for column in vocabularies})
+
+    X_chunks, y_chunks = [], []
+    for chunk in pd.read_csv(path, usecols=FEATURES + [TARGET], dtype=dtypes, chunksize=chunksize):
+        chunk = chunk.dropna()
+        X_chunk = np.empty((len(chunk), len(FEATURES)), dtype=np.float32)
+        for col, feature in enumerate(FEATURES):
+            values = chunk[feature]
+            X_chunk[:, col] = values.cat.codes if feature in CATEGORICAL_ENCODERS else values
+        X_chunks.append(X_chunk)
+        y_chunks.append(chunk[TARGET].cat.codes.to_numpy(dtype=np.int8))
+
+    return np.concatenate(X_chunks), np.concatenate(y_chunks), vocabularies
+
+
+def load_features(path: str, chunksize: int, cache_dir: str = None):
+    """
+    Encoded features for a dataset, cached per dataset digest. Cached arrays are
+    memory-mapped, so cross-validation workers share them instead of copying.
+    """
+    data_digest = file_digest(path)
+    if cache_dir is None:
+        X, y, vocabularies = encode_dataset(path, chunksize)
+        return X, y, vocabularies, data_digest
+
+    directory = os.path.join(cache_dir, data_digest[:16])
+    meta_path = os.path.join(directory, "features.json")
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if (meta.get('version') == FEATURE_CACHE_VERSION and meta.get('features') == FEATURES
+                and meta.get('data_sha256') == data_digest):
+            X = np.load(os.path.join(directory, "X.npy"), mmap_mode='r')
+            y = np.load(os.path.join(directory, "y.npy"), mmap_mode='r')
+            return X, y, meta['vocabularies'], data_digest
+
+    X, y, vocabularies = encode_dataset(path, chunksize)
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, "X.npy"), X)
+    np.save(os.path.join(directory, "y.npy"), y)
+    # The metadata is written last and atomically, so a partial cache is never used
+    tmp_path = f"{meta_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': FEATURE_CACHE_VERSION, 'features': FEATURES, 'data_sha256': data_digest,
+                   'rows': len(X), 'vocabularies': vocabularies}, f, indent=2)
+    os.replace(tmp_path, meta_path)
+    return X, y, vocabularies, data_digest
+
+
+def fitted_encoders(vocabularies: Dict[str, List[str]]) -> Dict[str, LabelEncoder]:
+    """
+    LabelEncoders equivalent to fitting on the data, built from the fixed vocabularies
+    """
+    encoders = {}
+    for column, name in list(CATEGORICAL_ENCODERS.items()) + [(TARGET, 'le_target')]:
+        encoders[name] = LabelEncoder()
+        encoders[name].classes_ = np.asarray(vocabularies[column], dtype=object)
+    return encoders
+
+
+def fit_fold(params: Dict, X: np.ndarray, y: np.ndarray, train_idx: np.ndarray, test_idx: np.ndarray,
+             trace_memory: bool = False):
+    """
+    Fit one configuration on one fold; returns fit seconds, accuracy and, when traced,
+    peak allocated bytes. Tracing slows fits down, so it is a separate, untimed fit.
+    """
+    start = time.perf_counter()
+    model = DecisionTreeClassifier(random_state=0, **params).fit(X[train_idx], y[train_idx])
+    fit_seconds = time.perf_counter() - start
+    accuracy = model.score(X[test_idx], y[test_idx])
+
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        DecisionTreeClassifier(random_state=0, **params).fit(X[train_idx], y[train_idx])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return fit_seconds, accuracy, peak
+
+
+def search_hyperparameters(X: np.ndarray, y: np.ndarray, folds: int = 5, n_jobs: int = -1,
+                           param_grid: Dict = None) -> List[Dict]:
+    """
+    Cross-validate every configuration of the grid, fitting (configuration, fold) pairs in
+    parallel. Returns one report entry per configuration, best mean accuracy first.
+    """
+    # Every fold needs each class at least once in its test split
+    folds = max(2, min(folds, int(np.bincount(y).min())))
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=0).split(np.zeros(len(y)), y))
+    grid = list(ParameterGrid(param_grid or PARAM_GRID))
+
+    # Peak memory barely varies between folds, so only each configuration's first fold is traced
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(fit_fold)(params, X, y, train_idx, test_idx, trace_memory=fold == 0)
+        for params in grid for fold, (train_idx, test_idx) in enumerate(splits)
+    )
+
+    report = []
+    for config, params in enumerate(grid):
+        fit_seconds, accuracies, peaks = zip(*results[config * folds:(config + 1) * folds])
+        report.append({
+            'params': params,
+            'folds': folds,
+            'accuracy': float(np.mean(accuracies)),
+            'accuracy_std': float(np.std(accuracies)),
+            'fit_seconds': float(np.mean(fit_seconds)),
+            'peak_mib': peaks[0] / 2 ** 20
+        })
+    # Stable sort: among equally accurate configurations the earlier (simpler) one stays first
+    return sorted(report, key=lambda entry: -entry['accuracy'])
+
+
+def print_report(report: List[Dict]):
+    print(f"{'criterion':>9} {'max_depth':>9} {'min_leaf':>8} | {'accuracy':>13} | {'fit ms':>8} | {'peak MiB':>8}")
+    for entry in report:
+        params = entry['params']
+        print(f"{params['criterion']:>9} {str(params['max_depth']):>9} {params['min_samples_leaf']:>8} | "
+              f"{entry['accuracy']:.3f} ± {entry['accuracy_std']:.3f} | "
+              f"{entry['fit_seconds'] * 1000:8.2f} | {entry['peak_mib']:8.2f}")
+
+
+def train(X: np.ndarray, y: np.ndarray, params: Dict) -> DecisionTreeClassifier:
+    """
+    Fit the dosha DecisionTreeClassifier on all encoded rows
+    """
+    return DecisionTreeClassifier(random_state=0, **params).fit(X, y)
+
+
+def load_pickles(model_dir: str):
+    """
+    Legacy model: the DecisionTreeClassifier and LabelEncoders as five separate pickles
+    """
+    model = joblib.load(os.path.join(model_dir, "dosha_model.pkl"))
+    encoders = {
+        name: joblib.load(os.path.join(model_dir, f"{name}.pkl"))
+        for name in list(CATEGORICAL_ENCODERS.values()) + ['le_target']
+    }
+    return model, encoders
+
+
+def export_compiled_model(model, encoders, path: str, metadata: Dict = None):
+    """
+    Flatten the fitted tree and encoders into a model bundle for CompiledDoshaModel:
+    split feature and threshold per node, child indexes (-1 at leaves) and the class
+    each node predicts, with the target labels and categorical vocabularies in the manifest
+    """
+    if hasattr(model, "feature_names_in_") and list(model.feature_names_in_) != FEATURES:
+        raise ValueError(f"Model was trained on {list(model.feature_names_in_)}, expected {FEATURES}")
+
+    tree = model.tree_
+    # Same argmax over class counts as DecisionTreeClassifier.predict, mapped to target labels
+    node_class = model.classes_[tree.value[:, 0, :].argmax(axis=1)]
+
+    arrays = {
+        'feature': tree.feature.astype(np.intp),
+        'threshold': tree.threshold.astype(np.float64),
+        'children_left': tree.children_left.astype(np.intp),
+        'children_right': tree.children_right.astype(np.intp),
+        'node_class': node_class.astype(np.intp),
+    }
+    categories = {column: [str(label) for label in encoders[name].classes_]
+                  for column, name in CATEGORICAL_ENCODERS.items()}
+    classes = [str(label) for label in encoders['le_target'].classes_]
+    return write_bundle(path, arrays, classes, categories, metadata)
+
+
+def sklearn_predict(model, encoders, patients: pd.DataFrame) -> np.ndarray:
+    X = patients[FEATURES].copy()
+    for column, name in CATEGORICAL_ENCODERS.items():
+        X[column] = encoders[name].transform(X[column])
+    # Legacy pickles were fitted on a DataFrame, pipeline models on a bare array
+    if not hasattr(model, "feature_names_in_"):
+        X = X.to_numpy()
+    return encoders['le_target'].inverse_transform(model.predict(X))
+
+
+def synthetic_patients(ranges: Dict[str, Tuple[float, float]], encoders, rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Random patients spanning (and exceeding) the training ranges, for parity checks
+    """
+    rng = np.random.default_rng(seed)
+    patients = {}
+    for column in NUMERIC_FEATURES:
+        low, high = ranges[column]
+        spread = high - low
+        patients[column] = rng.uniform(low - spread, high + spread, rows).round(1)
+    for column, name in CATEGORICAL_ENCODERS.items():
+        patients[column] = rng.choice(encoders[name].classes_, rows)
+    return pd.DataFrame(patients)
+
+
+def check_compiled_model(model, encoders, path: str, ranges: Dict[str, Tuple[float, float]],
+                         rows: int = 1000) -> int:
+    """
+    Compare the compiled model with scikit-learn on a synthetic batch; prints batch
+    latency and returns the number of mismatching predictions
+    """
+    compiled = load_bundle(path)
+    patients = synthetic_patients(ranges, encoders, rows)
+    columns = {column: patients[column].to_numpy() for column in FEATURES}
+
+    start = time.perf_counter()
+    expected = sklearn_predict(model, encoders, patients)
+    sklearn_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predicted = compiled.predict_batch(**columns)
+    compiled_seconds = time.perf_counter() - start
+
+    mismatches = int((predicted != expected).sum())
+    print(f"Parity on {len(patients)} patients: {mismatches} mismatches | "
+          f"sklearn {sklearn_seconds * 1e6 / len(patients):.2f} us/patient, "
+          f"compiled {compiled_seconds * 1e6 / len(patients):.2f} us/patient")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the dosha classifier and export it as a model bundle")
+    parser.add_argument("--data", default=os.path.join(ML_MODEL_DIR, "dosha_dataset.csv"),
+                        help="Assessment CSV (age, weight, height, sleep, digestion, body_type, dosha)")
+    parser.add_argument("--out", default=ML_MODEL_DIR, help="Directory for the model bundle")
+    parser.add_argument("--chunksize", type=int, default=100000, help="Rows read per CSV chunk")
+    parser.add_argument("--cache-dir", default=os.path.join(ML_MODEL_DIR, ".cache"),
+                        help="Where encoded features are cached per dataset digest")
+    parser.add_argument("--no-cache", action="store_true", help="Encode the dataset without caching it")
+    parser.add_argument("--folds", type=int, default=5, help="Cross-validation folds")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Parallel fits (-1: all cores)")
+    parser.add_argument("--report", help="Write the per-configuration search report to this JSON file")
+    parser.add_argument("--from-pickles", action="store_true",
+                        help="Convert the legacy pickles in --out (trained on --data) instead of retraining")
+    parser.add_argument("--check-rows", type=int, default=1000,
+                        help="Synthetic patients for the bundle/scikit-learn parity check (0 skips it)")
+    args = parser.parse_args()
 
-# Load dataset
-data = pd.read_csv("dosha_dataset.csv")
+    start = time.perf_counter()
+    X, y, vocabularies, data_digest = load_features(args.data, args.chunksize,
+                                                    None if args.no_cache else args.cache_dir)
+    print(f"Loaded {len(X)} encoded rows in {time.perf_counter() - start:.2f}s")
+    ranges = {feature: (float(X[:, col].min()), float(X[:, col].max()))
+              for col, feature in enumerate(FEATURES) if feature in NUMERIC_FEATURES}
 
-# Encode categorical columns
-le_sleep = LabelEncoder()
-le_digestion = LabelEncoder()
-le_body = LabelEncoder()
-le_target = LabelEncoder()
+    metadata = {
+        'training_data': os.path.basename(args.data),
+        'training_data_sha256': data_digest,
+        'training_rows': len(X),
+        'sklearn_version': sklearn.__version__
+    }
+    if args.from_pickles:
+        model, encoders = load_pickles(args.out)
+    else:
+        report = search_hyperparameters(X, y, args.folds, args.n_jobs)
+        print_report(report)
+        if args.report:
+            with open(args.report, 'w') as f:
+                json.dump(report, f, indent=2)
 
-data["sleep"] = le_sleep.fit_transform(data["sleep"])
-data["digestion"] = le_digestion.fit_transform(data["digestion"])
-data["body_type"] = le_body.fit_transform(data["body_type"])
-data["dosha"] = le_target.fit_transform(data["dosha"])
+        best = report[0]
+        model, encoders = train(X, y, best['params']), fitted_encoders(vocabularies)
+        metadata.update({'hyperparameters': best['params'], 'cv_accuracy': best['accuracy'],
+                         'cv_folds': best['folds']})
+        print(f"Model trained successfully! Best {best['params']} (CV accuracy {best['accuracy']:.3f})")
 
-# Features and target
-X = data[["age", "weight", "height", "sleep", "digestion", "body_type"]]
-y = data["dosha"]
+    bundle_path = os.path.join(args.out, BUNDLE_DIR)
+    export_compiled_model(model, encoders, bundle_path, metadata)
+    print(f"Exported model bundle to {bundle_path}")
 
-# Train model
-model = DecisionTreeClassifier()
-model.fit(X, y)
+    if args.check_rows and check_compiled_model(model, encoders, bundle_path, ranges, args.check_rows):
+        raise SystemExit("Model bundle does not match scikit-learn")
 
-# Save everything (IMPORTANT)
-joblib.dump(model, "dosha_model.pkl")
-joblib.dump(le_sleep, "le_sleep.pkl")
-joblib.dump(le_digestion, "le_digestion.pkl")
-joblib.dump(le_body, "le_body.pkl")
-joblib.dump(le_target, "le_target.pkl")
 
-print("Model trained successfully!")
\ No newline at end of file
+if __name__ == "__main__":
+    main()